@@ -5,6 +5,8 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 
+from enigh.agregados import leer_agregados, tabla
+
 # --- 1. CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(
     page_title="Brecha Digital en México | Panorama General",
@@ -12,10 +14,68 @@ st.set_page_config(
     layout="wide"
 )
 
+# Series calculadas por el pipeline (python -m enigh.etl); sin ellas se usan las cifras del estudio
+agregados = leer_agregados()
+
+data_acceso = {
+    'Año': [2018, 2020, 2022, 2024] * 3,
+    'Grupo': ['Hogares Totales']*4 + ['Hogares en Pobreza']*4 + ['Hogares en Pobreza Extrema']*4,
+    'Porcentaje': [86.11, 90.12, 92.31, 94.79, 77.29, 85.61, 87.81, 90.75, 59.70, 75.97, 79.91, 82.89],
+    'Hogares_Miles': [23500, 25800, 28200, 31200, 12800, 15200, 16800, 18900, 3200, 4100, 4800, 5600]  # Datos simulados
+}
+df_acceso = tabla(agregados, 'acceso', pd.DataFrame(data_acceso))
+
+data_calidad = {
+    'Año': [2018, 2020, 2022, 2024],
+    'Con_Celular_e_Internet': [3.24, 15.35, 18.82, 27.13],
+    'Solo_Celular': [56.46, 60.62, 61.09, 55.76],
+    'Sin_Celular': [40.30, 24.03, 20.09, 17.11]
+}
+df_calidad = tabla(agregados, 'calidad', pd.DataFrame(data_calidad))
+
+data_gasto = {
+    'Año': [2018, 2020, 2022, 2024],
+    'Pobreza_Extrema': [2.02, 3.64, 2.85, 2.86],
+    'Pobreza_Moderada': [1.89, 2.95, 2.31, 2.34],
+    'No_Pobre': [1.76, 2.78, 2.18, 2.21]
+}
+df_gasto = pd.DataFrame(data_gasto)
+if agregados and agregados.get('gasto'):
+    df_gasto = (
+        tabla(agregados, 'gasto', None)
+        .pivot(index='Año', columns='Grupo', values='pct_gasto_promedio')
+        .rename(columns=lambda grupo: grupo.replace(' ', '_'))
+        .reset_index()
+    )
+
+# Cifras del primer y último año para el resumen
+acceso_extrema = df_acceso[df_acceso['Grupo'] == 'Hogares en Pobreza Extrema'].sort_values('Año')
+año_inicial, año_final = int(acceso_extrema['Año'].iloc[0]), int(acceso_extrema['Año'].iloc[-1])
+celular_inicial, celular_final = acceso_extrema['Porcentaje'].iloc[0], acceso_extrema['Porcentaje'].iloc[-1]
+df_calidad = df_calidad.sort_values('Año')
+internet_inicial, internet_final = df_calidad['Con_Celular_e_Internet'].iloc[0], df_calidad['Con_Celular_e_Internet'].iloc[-1]
+sin_celular_inicial, sin_celular_final = df_calidad['Sin_Celular'].iloc[0], df_calidad['Sin_Celular'].iloc[-1]
+solo_celular_final = df_calidad['Solo_Celular'].iloc[-1]
+# Sin conexión completa en el primer año el crecimiento se expresa en puntos porcentuales
+if internet_inicial > 0:
+    crecimiento_internet = f"{internet_final / internet_inicial:.0f} veces"
+else:
+    crecimiento_internet = f"{internet_final - internet_inicial:.1f} pp"
+# Hogares en pobreza extrema con celular ganados en el periodo (millones); los miles de
+# hogares de respaldo son simulados, así que sin agregados se usa la cifra del estudio
+if agregados and agregados.get('acceso'):
+    con_celular = acceso_extrema['Hogares_Miles'] * acceso_extrema['Porcentaje'] / 100
+    millones_conectados = (con_celular.iloc[-1] - con_celular.iloc[0]) / 1000
+else:
+    millones_conectados = 1.8
+df_gasto = df_gasto.sort_values('Año')
+gasto_inicial, gasto_final = df_gasto['Pobreza_Extrema'].iloc[0], df_gasto['Pobreza_Extrema'].iloc[-1]
+gasto_pico = df_gasto.loc[df_gasto['Pobreza_Extrema'].idxmax()]
+
 # --- 2. HERO SECTION CON DISEÑO MINIMALISTA ---
-st.markdown("""
+st.markdown(f"""
 <style>
-.hero-container {
+.hero-container {{
     background: rgba(255, 255, 255, 0.1);
     padding: 3rem 2rem;
     border: 1px solid rgba(128, 128, 128, 0.1);
@@ -23,22 +83,22 @@ st.markdown("""
     margin-bottom: 2rem;
     text-align: center;
     backdrop-filter: blur(5px);
-}
-.hero-title {
+}}
+.hero-title {{
     font-size: 2.8rem;
     font-weight: 600;
     margin-bottom: 1rem;
     color: white;
     line-height: 1.2;
-}
-.hero-subtitle {
+}}
+.hero-subtitle {{
     font-size: 1.3rem;
     font-weight: 400;
     margin-bottom: 1.5rem;
     color: white;
     line-height: 1.4;
-}
-.hero-insight {
+}}
+.hero-insight {{
     font-size: 1.1rem;
     font-weight: 400;
     color: white;
@@ -48,22 +108,22 @@ st.markdown("""
     border-left: 3px solid #3498db;
     background: rgba(52, 152, 219, 0.05);
     border-radius: 0 10px 10px 0;
-}
-.impact-number {
+}}
+.impact-number {{
     font-size: 1.4rem;
     font-weight: 600;
     color: #2980b9;
     padding: 0.2rem 0.5rem;
     background: rgba(41, 128, 185, 0.1);
     border-radius: 6px;
-}
+}}
 </style>
 
 <div class="hero-container">
     <div class="hero-title">📱 La Transformación Digital Silenciosa</div>
-    <div class="hero-subtitle">Cómo México Revolucionó la Conectividad en sus Hogares más Vulnerables (2018-2024)</div>
+    <div class="hero-subtitle">Cómo México Revolucionó la Conectividad en sus Hogares más Vulnerables ({año_inicial}-{año_final})</div>
     <div class="hero-insight">
-        En solo seis años, <span class="impact-number">23.2 puntos porcentuales</span> más de hogares en pobreza extrema 
+        En solo {año_final - año_inicial} años, <span class="impact-number">{celular_final - celular_inicial:.1f} puntos porcentuales</span> más de hogares en pobreza extrema 
         lograron acceso a telefonía celular. Esta es la historia de la transformación digital más importante de la década.
     </div>
 </div>
@@ -78,26 +138,26 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         label="🎯 Hogares P. Extrema con Celular",
-        value="82.9%",
-        delta="+23.2 pp vs 2018",
+        value=f"{celular_final:.1f}%",
+        delta=f"{celular_final - celular_inicial:+.1f} pp vs {año_inicial}",
         delta_color="normal",
-        help="De 59.7% en 2018 a 82.9% en 2024"
+        help=f"De {celular_inicial:.1f}% en {año_inicial} a {celular_final:.1f}% en {año_final}"
     )
 
 with col2:
     st.metric(
         label="📡 Con Celular + Internet Casa",
-        value="27.1%",
-        delta="+23.9 pp vs 2018",
+        value=f"{internet_final:.1f}%",
+        delta=f"{internet_final - internet_inicial:+.1f} pp vs {año_inicial}",
         delta_color="normal",
-        help="Multiplicó por 8 su acceso a conectividad completa"
+        help=f"Su acceso a conectividad completa creció {crecimiento_internet}"
     )
 
 with col3:
     st.metric(
         label="💰 % Ingreso Destinado",
-        value="2.86%",
-        delta="+0.84 pp vs 2018",
+        value=f"{gasto_final:.2f}%",
+        delta=f"{gasto_final - gasto_inicial:+.2f} pp vs {año_inicial}",
         delta_color="normal",
         help="El gasto se consolidó como esencial"
     )
@@ -114,15 +174,6 @@ with col4:
 # --- 4. VISUALIZACIÓN PRINCIPAL INTERACTIVA ---
 st.header('📈 La Transformación en Acción: Evolución del Acceso por Grupo')
 
-# Datos para el gráfico principal
-data_acceso = {
-    'Año': [2018, 2020, 2022, 2024] * 3,
-    'Grupo': ['Hogares Totales']*4 + ['Hogares en Pobreza']*4 + ['Hogares en Pobreza Extrema']*4,
-    'Porcentaje': [86.11, 90.12, 92.31, 94.79, 77.29, 85.61, 87.81, 90.75, 59.70, 75.97, 79.91, 82.89],
-    'Hogares_Miles': [23500, 25800, 28200, 31200, 12800, 15200, 16800, 18900, 3200, 4100, 4800, 5600]  # Datos simulados
-}
-df_acceso = pd.DataFrame(data_acceso)
-
 # Crear el gráfico principal con mejor diseño
 fig_main = px.line(
     df_acceso, 
@@ -170,8 +221,8 @@ fig_main.update_layout(
 
 # Añadir anotaciones para destacar puntos clave
 fig_main.add_annotation(
-    x=2024, y=82.89,
-    text="¡23.2 pp de crecimiento!",
+    x=año_final, y=celular_final,
+    text=f"¡{celular_final - celular_inicial:.1f} pp de crecimiento!",
     showarrow=True,
     arrowhead=2,
     arrowcolor="#DC143C",
@@ -188,40 +239,40 @@ st.header('💡 Los 3 Descubrimientos que Cambian la Narrativa', divider='rainbo
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.markdown("""
+    st.markdown(f"""
     ### 🎯 **1. Acceso Casi Universal**
     
     **El problema del "sin dispositivo" está prácticamente resuelto**
     
-    - **2018:** 4 de cada 10 hogares en pobreza extrema sin celular
-    - **2024:** Solo 1 de cada 6 hogares sin celular
-    - **Impacto:** 1.8 millones de hogares más conectados
+    - **{año_inicial}:** {sin_celular_inicial / 10:.0f} de cada 10 hogares en pobreza extrema sin celular
+    - **{año_final}:** Solo 1 de cada {100 / sin_celular_final:.0f} hogares sin celular
+    - **Impacto:** {millones_conectados:.1f} millones de hogares más conectados
     
     > *"La brecha de acceso básico se cerró más rápido de lo que cualquier política pública hubiera podido lograr"*
     """)
 
 with col2:
-    st.markdown("""
+    st.markdown(f"""
     ### 📡 **2. La Calidad Sí Importa**
     
     **Tener celular ≠ Estar verdaderamente conectado**
     
-    - **Internet en casa** creció 8 veces (3.2% → 27.1%)
-    - Pero aún **55% solo tiene celular** sin internet fijo
+    - **Internet en casa** creció {crecimiento_internet} ({internet_inicial:.1f}% → {internet_final:.1f}%)
+    - Pero aún **{solo_celular_final:.0f}% solo tiene celular** sin internet fijo
     - **Nueva brecha:** Calidad de la conexión
     
     > *"El siguiente desafío no es el dispositivo, sino la infraestructura de conectividad"*
     """)
 
 with col3:
-    st.markdown("""
+    st.markdown(f"""
     ### 💰 **3. Gasto Esencial**
     
     **El celular se volvió tan básico como la comida**
     
-    - **2018:** 2.02% del ingreso familiar
-    - **2024:** 2.86% del ingreso familiar  
-    - **Pico pandemia:** 3.64% (2020)
+    - **{año_inicial}:** {gasto_inicial:.2f}% del ingreso familiar
+    - **{año_final}:** {gasto_final:.2f}% del ingreso familiar  
+    - **Pico:** {gasto_pico['Pobreza_Extrema']:.2f}% ({int(gasto_pico['Año'])})
     - **Realidad:** Es un gasto no negociable
     
     > *"Las familias prefieren sacrificar otros gastos antes que quedarse sin celular"*
@@ -234,15 +285,6 @@ st.header('⚡ Análisis de Profundidad: Calidad vs Esfuerzo Económico')
 col1, col2 = st.columns(2)
 
 with col1:
-    # Datos para calidad de conexión
-    data_calidad = {
-        'Año': [2018, 2020, 2022, 2024],
-        'Con_Celular_e_Internet': [3.24, 15.35, 18.82, 27.13],
-        'Solo_Celular': [56.46, 60.62, 61.09, 55.76],
-        'Sin_Celular': [40.30, 24.03, 20.09, 17.11]
-    }
-    df_calidad = pd.DataFrame(data_calidad)
-    
     # Gráfico de área apilada
     fig_calidad = go.Figure()
     
@@ -278,21 +320,12 @@ with col1:
     
     st.plotly_chart(fig_calidad, use_container_width=True)
     
-    st.markdown("""
+    st.markdown(f"""
     **🔍 Insight Clave:**  
-    El área verde (conexión completa) creció 8 veces, pero la naranja (solo celular) sigue siendo mayoritaria.
+    El área verde (conexión completa) creció {crecimiento_internet}, pero la naranja (solo celular, {solo_celular_final:.0f}% en {año_final}) sigue siendo mayoritaria.
     """)
 
 with col2:
-    # Datos para gasto
-    data_gasto = {
-        'Año': [2018, 2020, 2022, 2024],
-        'Pobreza_Extrema': [2.02, 3.64, 2.85, 2.86],
-        'Pobreza_Moderada': [1.89, 2.95, 2.31, 2.34],
-        'No_Pobre': [1.76, 2.78, 2.18, 2.21]
-    }
-    df_gasto = pd.DataFrame(data_gasto)
-    
     # Gráfico de líneas con áreas
     fig_gasto = go.Figure()
     
@@ -384,10 +417,10 @@ with col2:
     # Gráfico de progreso hacia el futuro
     fig_progress = go.Figure(go.Indicator(
         mode = "gauge+number+delta",
-        value = 82.9,
+        value = round(celular_final, 1),
         domain = {'x': [0, 1], 'y': [0, 1]},
         title = {'text': "Progreso hacia<br>Acceso Universal<br>(Meta: 95%)"},
-        delta = {'reference': 59.7, 'suffix': " pp desde 2018"},
+        delta = {'reference': round(celular_inicial, 1), 'suffix': f" pp desde {año_inicial}"},
         gauge = {
             'axis': {'range': [None, 100]},
             'bar': {'color': "darkblue"},
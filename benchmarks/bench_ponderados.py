@@ -0,0 +1,115 @@
+"""Benchmark: groupby().apply(lambda) contra el motor de agregaciones ponderadas.
+
+Reproduce las cuatro agregaciones de la página de exploración (evolución por año,
+carencias por ámbito, estados y deciles de ingreso) sobre los años ENIGH
+disponibles en data/procesados, acumulando un año más en cada ronda.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_ponderados --repeticiones 5
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from enigh.ponderados import MEDIA, PROPORCION, TOTAL, agregar_ponderado
+
+AÑOS = [2018, 2020, 2022, 2024]
+CARENCIAS = ['ic_rezedu', 'ic_asalud', 'ic_segsoc', 'ic_cv', 'ic_sbv', 'ic_ali']
+
+
+def cargar_año(año):
+    """Lee un año enriquecido y crea las columnas auxiliares que usa la página"""
+    df = pd.read_parquet(f'data/procesados/enigh_{año}_final_enriquecido.parquet')
+    df['Año'] = año
+    df['tiene_celular'] = (df['celular'] == 1).astype(int)
+    df['tiene_internet'] = (df['conex_inte'] == 1).astype(int)
+    df['conexion_completa'] = ((df['celular'] == 1) & (df['conex_inte'] == 1)).astype(int)
+    df['Ambito'] = np.where(df['rururb'] == 1, 'Rural', 'Urbano')
+    df['pct_gasto_celular'] = np.where(
+        (df['ict'] > 0) & (df['ict'].notna()),
+        (df['gasto_celular'] / df['ict']) * 100, 0
+    )
+    df['Decil_Ingreso'] = pd.qcut(df['ictpc'], q=10, labels=[f'D{i}' for i in range(1, 11)])
+    return df
+
+
+def con_apply(df):
+    """Versión original de la página"""
+    df.groupby('Año').apply(lambda x: pd.Series({
+        'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Acceso_Internet': (x['tiene_internet'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Conexion_Completa': (x['conexion_completa'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Hogares': x['factor'].sum()
+    }))
+    df.groupby('Ambito').apply(lambda x: pd.Series({
+        carencia: (x[carencia] * x['factor']).sum() / x['factor'].sum() * 100 for carencia in CARENCIAS
+    }))
+    df.groupby('entidad').apply(lambda x: pd.Series({
+        'Hogares': x['factor'].sum(),
+        'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Ingreso_Promedio': (x['ictpc'] * x['factor']).sum() / x['factor'].sum()
+    }))
+    df.groupby('Decil_Ingreso', observed=True).apply(lambda x: pd.Series({
+        'Ingreso_Promedio': (x['ictpc'] * x['factor']).sum() / x['factor'].sum(),
+        'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Acceso_Internet': (x['tiene_internet'] * x['factor']).sum() / x['factor'].sum() * 100,
+        'Gasto_Celular_Pct': (x['pct_gasto_celular'] * x['factor']).sum() / x['factor'].sum()
+    }))
+
+
+def con_motor(df):
+    """Versión con el motor de agregaciones ponderadas"""
+    agregar_ponderado(df, 'factor', ['Año'], {
+        'Acceso_Celular': (PROPORCION, 'tiene_celular'),
+        'Acceso_Internet': (PROPORCION, 'tiene_internet'),
+        'Conexion_Completa': (PROPORCION, 'conexion_completa'),
+        'Hogares': (TOTAL, 'factor')
+    })
+    agregar_ponderado(df, 'factor', ['Ambito'], {c: (PROPORCION, c) for c in CARENCIAS})
+    agregar_ponderado(df, 'factor', ['entidad'], {
+        'Hogares': (TOTAL, 'factor'),
+        'Acceso_Celular': (PROPORCION, 'tiene_celular'),
+        'Ingreso_Promedio': (MEDIA, 'ictpc')
+    })
+    agregar_ponderado(df, 'factor', ['Decil_Ingreso'], {
+        'Ingreso_Promedio': (MEDIA, 'ictpc'),
+        'Acceso_Celular': (PROPORCION, 'tiene_celular'),
+        'Acceso_Internet': (PROPORCION, 'tiene_internet'),
+        'Gasto_Celular_Pct': (MEDIA, 'pct_gasto_celular')
+    }, dropna=True)
+
+
+def cronometrar(funcion, df, repeticiones):
+    """Mejor tiempo (s) de varias repeticiones"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(df)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    años = [a for a in AÑOS if os.path.exists(f'data/procesados/enigh_{a}_final_enriquecido.parquet')]
+    if not años:
+        raise SystemExit("No se encontraron archivos enigh_{año}_final_enriquecido.parquet en data/procesados")
+
+    marcos = [cargar_año(año) for año in años]
+    print(f"{'Años':<22}{'Hogares':>10}{'apply (ms)':>13}{'motor (ms)':>13}{'Aceleración':>13}")
+    for n in range(1, len(marcos) + 1):
+        df = pd.concat(marcos[:n], ignore_index=True)
+        t_apply = cronometrar(con_apply, df, args.repeticiones)
+        t_motor = cronometrar(con_motor, df, args.repeticiones)
+        etiqueta = ', '.join(map(str, años[:n]))
+        print(f"{etiqueta:<22}{len(df):>10,}{t_apply * 1000:>13.1f}{t_motor * 1000:>13.1f}{t_apply / t_motor:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
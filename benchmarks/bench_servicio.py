@@ -0,0 +1,76 @@
+"""Benchmark: carga de un año desde el parquet de servicio contra la copia Arrow mapeada.
+
+Cada medición corre en un proceso nuevo, como el arranque de un worker de
+Streamlit: lee la tabla de servicio del año, la convierte a DataFrame como lo hace
+el almacén y recorre una columna para tocar sus páginas. Reporta la latencia y la
+memoria residente que agrega la carga, separando la memoria privada del proceso
+(``RssAnon``) de las páginas del archivo (``RssFile``), que viven en la caché del
+sistema operativo y se comparten entre procesos.
+
+Uso (desde la raíz del repositorio, después de ``python -m enigh.etl``):
+    python -m benchmarks.bench_servicio --repeticiones 5
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from enigh.almacen import a_pandas
+from enigh.carga import leer_servicio, leer_servicio_mapeado, ruta_servicio, ruta_servicio_arrow
+
+AÑOS = [2018, 2020, 2022, 2024]
+
+FORMATOS = {
+    'parquet': (ruta_servicio, leer_servicio),
+    'arrow (mmap)': (ruta_servicio_arrow, leer_servicio_mapeado),
+}
+
+
+def memoria_residente():
+    """(privada, archivo) en MB según /proc/self/status (ceros fuera de Linux)"""
+    valores = {}
+    try:
+        with open('/proc/self/status') as estado:
+            for linea in estado:
+                campo, _, resto = linea.partition(':')
+                if campo in ('RssAnon', 'RssFile'):
+                    valores[campo] = int(resto.split()[0]) / 1024
+    except OSError:
+        pass
+    return valores.get('RssAnon', 0.0), valores.get('RssFile', 0.0)
+
+
+def medir(formato, año):
+    """Se ejecuta en un proceso nuevo: (segundos, MB privados, MB de archivo) que agrega la carga"""
+    ruta, leer = FORMATOS[formato]
+    privada, archivo = memoria_residente()
+    inicio = time.perf_counter()
+    df = a_pandas(leer(ruta(año)))
+    df['factor'].sum()
+    segundos = time.perf_counter() - inicio
+    privada_final, archivo_final = memoria_residente()
+    return segundos, privada_final - privada, archivo_final - archivo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    años = [a for a in AÑOS if all(os.path.exists(ruta(a)) for ruta, _ in FORMATOS.values())]
+    if not años:
+        raise SystemExit("No hay tablas de servicio en data/procesados; genera con `python -m enigh.etl --solo-servicio`")
+
+    # 'spawn' da un intérprete limpio por medición, sin páginas heredadas del padre
+    contexto = multiprocessing.get_context('spawn')
+    print(f"{'Año':<6}{'Formato':<14}{'Carga (ms)':>12}{'RSS privada (MB)':>18}{'RSS archivo (MB)':>18}")
+    with contexto.Pool(1, maxtasksperchild=1) as pool:
+        for año in años:
+            for formato in FORMATOS:
+                mediciones = [pool.apply(medir, (formato, año)) for _ in range(args.repeticiones)]
+                segundos, privada, archivo = min(mediciones)
+                print(f"{año:<6}{formato:<14}{segundos * 1000:>12.1f}{privada:>18.1f}{archivo:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Verificación: cálculos vectorizados contra su versión directa (fuerza bruta).
+
+Compara, sobre datos sintéticos con la forma de la ENIGH (años, estratos, UPM,
+factor de expansión y nulos), tres cálculos cuya versión rápida no es evidente:
+
+- ``ReplicasBootstrap.errores`` contra recalcular cada métrica con los pesos de
+  réplica de cada hogar (factor · multiplicador de su UPM), réplica por réplica.
+- ``ModeloPerfiles.predecir`` contra ``StandardScaler`` + ``KMeans.predict`` de
+  scikit-learn (debe coincidir hogar por hogar).
+- ``cuantiles_ponderados`` e ``IndiceOrdenado`` contra la regla del punto medio
+  del peso acumulado aplicada hogar por hogar.
+
+Cualquier diferencia detiene el script con un AssertionError.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.verificar_calculos
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from enigh.cuantiles import IndiceOrdenado, cuantiles_ponderados
+from enigh.perfiles import ModeloPerfiles
+from enigh.ponderados import MEDIA, PROPORCION, TOTAL
+from enigh.varianza import ReplicasBootstrap
+
+METRICAS = {
+    'Hogares': (TOTAL, 'factor'),
+    'Ingreso': (TOTAL, 'ictpc'),
+    'Acceso_Celular': (PROPORCION, 'tiene_celular'),
+    'Ingreso_Promedio': (MEDIA, 'ictpc'),
+}
+
+
+def hogares_sinteticos(n, semilla):
+    """Hogares con diseño muestral (claves de UPM repetidas entre años), grupos y nulos"""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        'Año': rng.choice([2022, 2024], n),
+        'est_dis': rng.integers(1, 40, n),
+        'factor': rng.integers(50, 900, n).astype('float64'),
+        'tiene_celular': (rng.random(n) < 0.8).astype(int),
+        'ictpc': rng.lognormal(8, 1, n).round(-1),  # redondeo: produce empates
+        'Ambito': rng.choice(['Rural', 'Urbano'], n),
+    })
+    # La UPM está anidada en el estrato (unas cuantas por estrato, algunos con una sola)
+    df['upm'] = df['est_dis'] * 100 + rng.integers(0, 1 + df['est_dis'] % 5, n)
+    df.loc[rng.random(n) < 0.05, 'ictpc'] = np.nan
+    return df
+
+
+def metricas_directas(df, pesos):
+    """Las métricas de METRICAS con un vector de pesos por hogar, sin atajos"""
+    x = df['ictpc'].to_numpy()
+    validos = ~np.isnan(x)
+    return {
+        'Hogares': pesos.sum(),
+        'Ingreso': (pesos[validos] * x[validos]).sum(),
+        'Acceso_Celular': (pesos * df['tiene_celular'].to_numpy()).sum() / pesos.sum() * 100,
+        # Como metricas_desde_sumas: Σpeso·x (sin nulos) / Σpeso (todos)
+        'Ingreso_Promedio': (pesos[validos] * x[validos]).sum() / pesos.sum(),
+    }
+
+
+def verificar_replicas(n=4_000, semilla=1):
+    df = hogares_sinteticos(n, semilla)
+    replicas = ReplicasBootstrap(df, replicas=40)
+    posiciones = np.flatnonzero(df['Año'].to_numpy() == 2024)[::2]
+
+    for por in (None, 'Ambito'):
+        rapido = replicas.errores(df, posiciones, METRICAS, por=por)
+        seleccion = df.iloc[posiciones]
+        grupos = [(None, np.arange(len(seleccion)))] if por is None else [
+            (valor, np.flatnonzero(seleccion[por].to_numpy() == valor)) for valor in rapido[por]
+        ]
+        for i, (_, filas) in enumerate(grupos):
+            hogares = seleccion.iloc[filas]
+            codigos = replicas.codigos[posiciones][filas]
+            estimado = metricas_directas(hogares, hogares['factor'].to_numpy())
+            # Peso de réplica de cada hogar: factor por el multiplicador de su UPM
+            por_replica = [
+                metricas_directas(hogares, hogares['factor'].to_numpy() * replicas.multiplicadores[codigos, r])
+                for r in range(replicas.replicas)
+            ]
+            for nombre in METRICAS:
+                ee = np.sqrt(np.mean([(m[nombre] - estimado[nombre]) ** 2 for m in por_replica]))
+                assert np.isclose(rapido[nombre].iloc[i], estimado[nombre], rtol=1e-9), nombre
+                assert np.isclose(rapido[f'{nombre}_ee'].iloc[i], ee, rtol=1e-9), (nombre, por)
+    print(f"Errores bootstrap: {len(METRICAS)} métricas, sin grupos y por ámbito, iguales a la fuerza bruta")
+
+
+def verificar_perfiles(n=20_000, semilla=2):
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(semilla)
+    X = rng.normal(size=(n, 10)) * rng.uniform(0.5, 50, 10) + rng.uniform(-100, 100, 10)
+    escalador = StandardScaler().fit(X)
+    kmeans = KMeans(n_clusters=5, n_init=3, random_state=semilla).fit(escalador.transform(X))
+    modelo = ModeloPerfiles.desde_sklearn(escalador, kmeans)
+
+    nuevos = rng.normal(size=(n, 10)) * X.std(axis=0) + X.mean(axis=0)
+    esperado = kmeans.predict(escalador.transform(nuevos))
+    obtenido = modelo.predecir(nuevos)
+    diferencias = int(np.count_nonzero(obtenido != esperado))
+    assert diferencias == 0, f"{diferencias} asignaciones distintas de KMeans.predict"
+    print(f"Perfiles: {n:,} hogares asignados igual que KMeans.predict")
+
+
+def cuantil_directo(valores, pesos, q):
+    """Regla de ``enigh.cuantiles`` hogar por hogar: punto medio del peso acumulado; empates al primero"""
+    codigos = np.full(len(valores), -1)
+    orden = sorted((i for i in range(len(valores)) if not np.isnan(valores[i])), key=lambda i: valores[i])
+    total = sum(pesos[i] for i in orden)
+    acumulado, anterior, cuantil_anterior = 0.0, None, None
+    for i in orden:
+        acumulado += pesos[i]
+        cuantil = min(int(np.floor((acumulado - pesos[i] / 2) / total * q)), q - 1)
+        if anterior is not None and valores[i] == anterior:
+            cuantil = cuantil_anterior
+        codigos[i], anterior, cuantil_anterior = cuantil, valores[i], cuantil
+    return codigos
+
+
+def verificar_cuantiles(n=3_000, semilla=3):
+    df = hogares_sinteticos(n, semilla)
+    valores, pesos = df['ictpc'].to_numpy(), df['factor'].to_numpy()
+    for q in (4, 10, 100):
+        assert (cuantiles_ponderados(valores, pesos, q) == cuantil_directo(valores, pesos, q)).all(), q
+
+    # Cada cuantil junta ~1/q del peso (salvo lo que mueven los empates y un hogar en la frontera)
+    codigos = cuantiles_ponderados(valores, pesos, 10)
+    participacion = np.bincount(codigos[codigos >= 0], weights=pesos[codigos >= 0]) / pesos[codigos >= 0].sum()
+    assert np.abs(participacion - 0.1).max() < 0.01, participacion
+
+    # Ordenar una selección con el índice equivale a ordenarla de nuevo (sin nulos)
+    indice = IndiceOrdenado(df, 'ictpc')
+    filas = np.flatnonzero(df['Ambito'].to_numpy() == 'Rural')
+    directo = filas[~np.isnan(valores[filas])]
+    directo = directo[np.argsort(valores[directo], kind='stable')]
+    assert (indice.ordenar(filas) == directo).all()
+    print("Cuantiles: regla del punto medio e índice ordenado iguales a la versión directa (q = 4, 10, 100)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hogares', type=int, default=4_000,
+                        help='Hogares sintéticos para la verificación de los errores bootstrap')
+    args = parser.parse_args()
+
+    verificar_replicas(args.hogares)
+    verificar_perfiles()
+    verificar_cuantiles()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Series agregadas de las páginas 01, 02 y 03, calculadas desde los datos.
+
+En lugar de copiar cifras de la salida de los notebooks, el pipeline calcula (con
+el factor de expansión) el acceso a celular por grupo, la calidad de conexión y el
+gasto en celular de cada año, y la distribución de perfiles de pobreza extrema de
+los años con clusters asignados en su tabla de servicio. El resultado es un JSON
+pequeño que las páginas leen al instante; los años se toman de los archivos
+presentes, así que una nueva ola de la ENIGH entra sola al reconstruir.
+"""
+import glob
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from enigh.carga import derivar_columnas, leer_enriquecido, ruta_servicio
+from enigh.catalogos import PERFILES_POBREZA
+from enigh.ponderados import PROPORCION, TOTAL, MEDIA, agregar_ponderado
+
+VERSION_AGREGADOS = 1
+
+ARCHIVO_AGREGADOS = 'agregados.json'
+
+# Tamaños de perfiles del entrenamiento ponderado (``python -m enigh.segmentacion entrenar``), por grupo
+ARCHIVO_SEGMENTACION = 'segmentacion_{grupo}.json'
+
+# Grupo -> máscara de hogares (pobreza incluye a la pobreza extrema, como en CONEVAL)
+GRUPOS_ACCESO = {
+    'Hogares Totales': lambda df: np.ones(len(df), dtype=bool),
+    'Hogares en Pobreza': lambda df: (df['pobreza'] == 1).to_numpy(),
+    'Hogares en Pobreza Extrema': lambda df: (df['pobreza_e'] == 1).to_numpy(),
+}
+
+
+def años_disponibles(ruta_salida='data/procesados'):
+    """Años con parquet enriquecido en la carpeta, ordenados"""
+    patron = re.compile(r'enigh_(\d{4})_final_enriquecido\.parquet$')
+    años = (patron.search(os.path.basename(r)) for r in glob.glob(os.path.join(ruta_salida, 'enigh_*_final_enriquecido.parquet')))
+    return sorted(int(m.group(1)) for m in años if m)
+
+
+def acceso_por_grupo(df, año):
+    filas = []
+    for grupo, seleccion in GRUPOS_ACCESO.items():
+        metricas = agregar_ponderado(df[seleccion(df)], 'factor', None, {
+            'Porcentaje': (PROPORCION, 'tiene_celular'),
+            'Hogares': (TOTAL, 'factor'),
+        }).iloc[0]
+        filas.append({'Año': año, 'Grupo': grupo, 'Porcentaje': round(float(metricas['Porcentaje']), 2),
+                      'Hogares_Miles': round(float(metricas['Hogares']) / 1000)})
+    return filas
+
+
+def calidad_pobreza_extrema(df, año):
+    """Sin celular / solo celular / celular + internet en casa, en hogares en pobreza extrema"""
+    extrema = df[df['pobreza_e'] == 1]
+    extrema = extrema.assign(
+        sin_celular=1 - extrema['tiene_celular'],
+        solo_celular=extrema['tiene_celular'] - extrema['conexion_completa'],
+    )
+    metricas = agregar_ponderado(extrema, 'factor', None, {
+        'Sin_Celular': (PROPORCION, 'sin_celular'),
+        'Solo_Celular': (PROPORCION, 'solo_celular'),
+        'Con_Celular_e_Internet': (PROPORCION, 'conexion_completa'),
+    }).iloc[0]
+    return [{'Año': año, **{k: round(float(v), 2) for k, v in metricas.items()}}]
+
+
+def gasto_por_condicion(df, año):
+    """% promedio (ponderado) del ingreso destinado al celular por condición de pobreza"""
+    gasto = agregar_ponderado(df, 'factor', 'condicion_pobreza', {
+        'pct_gasto_promedio': (MEDIA, 'pct_gasto_celular'),
+    })
+    return [{'Año': año, 'Grupo': fila['condicion_pobreza'], 'pct_gasto_promedio': round(float(fila['pct_gasto_promedio']), 2)}
+            for _, fila in gasto.iterrows()]
+
+
+def perfiles_pobreza_extrema(df_clusters, año):
+    """Distribución ponderada de los hogares en pobreza extrema entre los perfiles"""
+    hogares = df_clusters.groupby('cluster')['factor'].sum()
+    porcentaje = hogares / hogares.sum() * 100
+    return [{'Año': año, 'Perfil': PERFILES_POBREZA[int(c)], 'Porcentaje': round(float(porcentaje[c]), 2),
+             'Hogares': int(round(hogares[c]))} for c in hogares.index]
+
+
+def perfiles_del_año(año, ruta_salida='data/procesados'):
+    """Perfiles del año desde la tabla de servicio o, si no los trae, desde el parquet de clusters del notebook"""
+    ruta = ruta_servicio(año, ruta_salida)
+    if os.path.exists(ruta):
+        df_clusters = pd.read_parquet(ruta, columns=['cluster', 'factor']).dropna(subset=['cluster'])
+        if len(df_clusters):
+            return perfiles_pobreza_extrema(df_clusters, año)
+
+    ruta = os.path.join(ruta_salida, f'enigh_{año}_clusters_pobreza_extrema.parquet')
+    if os.path.exists(ruta):
+        return perfiles_pobreza_extrema(pd.read_parquet(ruta, columns=['cluster', 'factor']), año)
+    return []
+
+
+def perfiles_entrenados(ruta_salida='data/procesados'):
+    """Tamaños por año del último entrenamiento ponderado de pobreza extrema, o lista vacía"""
+    try:
+        with open(os.path.join(ruta_salida, ARCHIVO_SEGMENTACION.format(grupo='extrema')), encoding='utf-8') as f:
+            segmentacion = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    return segmentacion['perfiles']
+
+
+def calcular_agregados(ruta_salida='data/procesados'):
+    """Calcula todas las series a partir de los parquet de la carpeta
+
+    Los perfiles salen del entrenamiento ponderado si existe; si no, de los clusters
+    asignados en las tablas de servicio.
+    """
+    agregados = {'version': VERSION_AGREGADOS, 'acceso': [], 'calidad': [], 'gasto': [], 'perfiles': []}
+    entrenados = perfiles_entrenados(ruta_salida)
+    años_entrenados = {fila['Año'] for fila in entrenados}
+
+    for año in años_disponibles(ruta_salida):
+        df = leer_enriquecido(os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet'))
+        derivar_columnas(df, año)
+        agregados['acceso'] += acceso_por_grupo(df, año)
+        agregados['calidad'] += calidad_pobreza_extrema(df, año)
+        agregados['gasto'] += gasto_por_condicion(df, año)
+        if año not in años_entrenados:
+            agregados['perfiles'] += perfiles_del_año(año, ruta_salida)
+    agregados['perfiles'] += entrenados
+
+    agregados['años'] = sorted({fila['Año'] for fila in agregados['acceso']})
+    return agregados
+
+
+def construir_agregados(ruta_salida='data/procesados'):
+    """Escribe agregados.json en la carpeta de datos procesados"""
+    archivo = os.path.join(ruta_salida, ARCHIVO_AGREGADOS)
+    temporal = archivo + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(calcular_agregados(ruta_salida), f, ensure_ascii=False, indent=1)
+    os.replace(temporal, archivo)
+    return archivo
+
+
+def leer_agregados(ruta_salida='data/procesados'):
+    """Agregados precalculados, o None si aún no se generan (las páginas usan sus cifras fijas)"""
+    archivo = os.path.join(ruta_salida, ARCHIVO_AGREGADOS)
+    try:
+        with open(archivo, encoding='utf-8') as f:
+            agregados = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return agregados if agregados.get('version') == VERSION_AGREGADOS else None
+
+
+def fecha_agregados(ruta_salida='data/procesados'):
+    """Fecha de modificación de agregados.json (o None): llave para las cachés que lo leen"""
+    archivo = os.path.join(ruta_salida, ARCHIVO_AGREGADOS)
+    return os.path.getmtime(archivo) if os.path.exists(archivo) else None
+
+
+def tabla(agregados, nombre, respaldo):
+    """Serie como DataFrame largo; si no hay datos para ella devuelve `respaldo`"""
+    if not agregados or not agregados.get(nombre):
+        return respaldo
+    return pd.DataFrame(agregados[nombre])
@@ -0,0 +1,239 @@
+"""Almacén de años cargados compartido por todas las sesiones del servidor.
+
+``st.cache_data`` no permite acotar la memoria por tamaño, y vaciarlo con
+``st.cache_data.clear()`` borra los datos de todos los usuarios. ``CacheLRU``
+guarda cada año una sola vez por proceso, mide su tamaño real en bytes y, al
+rebasar el máximo configurado, desaloja primero los años usados hace más tiempo,
+salvo los que alguna sesión tiene prestados. Las combinaciones de varios años
+(copias completas) cuentan contra el mismo máximo.
+
+``AlmacenCompartido`` guarda cada año como una tabla Arrow inmutable. Las
+sesiones no copian los datos: reciben un ``Prestamo`` que mantiene vivos los
+años que usan y entrega un DataFrame de solo lectura construido sin copia sobre
+los buffers de Arrow. Las selecciones de varios años se combinan una sola vez y
+se comparten entre todas las sesiones que piden la misma combinación.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import pyarrow as pa
+
+
+def tamaño_en_bytes(valor):
+    """Memoria real ocupada por un DataFrame o una tabla Arrow"""
+    if hasattr(valor, 'memory_usage'):
+        return int(valor.memory_usage(deep=True).sum())
+    return int(getattr(valor, 'nbytes', 0))
+
+
+def a_pandas(tabla):
+    """DataFrame sobre los buffers de la tabla (sin copia y de solo lectura cuando es posible)"""
+    return tabla.to_pandas(split_blocks=True)
+
+
+class CacheLRU:
+    """Caché LRU acotada por bytes, segura entre hilos y con entradas fijables"""
+
+    def __init__(self, max_bytes, bytes_externos=None):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # clave -> [valor, bytes, referencias]
+        self._candado = threading.Lock()
+        # Memoria fuera de la caché que también cuenta contra el máximo
+        self._bytes_externos = bytes_externos or (lambda: 0)
+
+    def __contains__(self, clave):
+        with self._candado:
+            return clave in self._entradas
+
+    @property
+    def bytes_usados(self):
+        with self._candado:
+            return sum(tamaño for _, tamaño, _ in self._entradas.values())
+
+    def claves(self):
+        with self._candado:
+            return list(self._entradas)
+
+    def obtener(self, clave, cargar, fijar=False):
+        """Devuelve el valor de `clave`, llamando a `cargar()` solo si no está en caché
+
+        Con `fijar=True` la entrada no se desaloja hasta el `soltar` correspondiente.
+        """
+        with self._candado:
+            if clave in self._entradas:
+                entrada = self._entradas[clave]
+                entrada[2] += fijar
+                self._entradas.move_to_end(clave)
+                return entrada[0]
+
+        # La carga ocurre fuera del candado para no bloquear a otras sesiones
+        valor = cargar()
+        if getattr(valor, 'empty', False) or getattr(valor, 'num_rows', 1) == 0:
+            return valor  # una carga fallida no se guarda
+
+        with self._candado:
+            if clave not in self._entradas:  # otra sesión pudo cargarlo mientras tanto
+                self._entradas[clave] = [valor, tamaño_en_bytes(valor), 0]
+            entrada = self._entradas[clave]
+            entrada[2] += fijar
+            self._entradas.move_to_end(clave)
+            self._desalojar()
+            return entrada[0]
+
+    def soltar(self, clave):
+        """Libera una referencia tomada con `fijar=True`"""
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas[clave][2] -= 1
+                self._desalojar()
+
+    def descartar(self, clave):
+        with self._candado:
+            self._entradas.pop(clave, None)
+
+    def desalojar(self):
+        """Vuelve a aplicar el máximo (p. ej. después de que crecieron los bytes externos)"""
+        with self._candado:
+            self._desalojar()
+
+    def _desalojar(self):
+        """Quita las entradas libres menos usadas hasta respetar el máximo (conserva la más reciente)"""
+        total = sum(tamaño for _, tamaño, _ in self._entradas.values()) + self._bytes_externos()
+        reciente = next(reversed(self._entradas), None)
+        for clave in list(self._entradas):
+            if total <= self.max_bytes:
+                break
+            _, tamaño, referencias = self._entradas[clave]
+            if referencias > 0 or clave == reciente:
+                continue
+            del self._entradas[clave]
+            total -= tamaño
+
+
+class Prestamo:
+    """Referencia ligera de una sesión a una selección de años del almacén
+
+    Cuando el préstamo deja de usarse (la sesión carga otra selección o expira),
+    sus años se liberan automáticamente. Solo se sueltan los años que el préstamo
+    llegó a fijar (un año cuya carga falló no tiene referencia que liberar), y una
+    combinación con años fallidos es propia del préstamo: no se comparte.
+    """
+
+    def __init__(self, almacen, claves, fijadas, propio=None):
+        self.claves = tuple(claves)
+        self._almacen = almacen
+        self._propio = propio  # [DataFrame, derivados] si la combinación no se comparte
+        weakref.finalize(self, almacen._soltar, self.claves, tuple(fijadas), propio is None)
+
+    def _combinado(self):
+        if self._propio is not None:
+            return self._propio
+        return self._almacen._combinado(self.claves)
+
+    def datos(self):
+        """DataFrame de solo lectura con todos los años del préstamo"""
+        return self._combinado()[0]
+
+    def derivado(self, nombre, construir):
+        """Estructura derivada de los datos (p. ej. un índice), construida una vez por combinación
+
+        `construir(df)` solo se llama la primera vez; el resultado se comparte con las
+        demás sesiones que usan la misma combinación y se libera junto con ella.
+        """
+        df, derivados = self._combinado()
+        if nombre not in derivados:
+            derivados.setdefault(nombre, construir(df))
+        return derivados[nombre]
+
+
+class AlmacenCompartido:
+    """Tablas Arrow inmutables por año, compartidas entre sesiones y con conteo de referencias"""
+
+    def __init__(self, max_bytes):
+        self._combinados = {}  # claves -> [DataFrame, referencias, derivados, bytes]
+        self._bytes_combinados = 0
+        self._candado = threading.Lock()
+        # Las combinaciones de varios años son copias: su memoria desaloja años libres
+        self._tablas = CacheLRU(max_bytes, bytes_externos=lambda: self._bytes_combinados)
+
+    def __contains__(self, clave):
+        return clave in self._tablas
+
+    @property
+    def max_bytes(self):
+        return self._tablas.max_bytes
+
+    @property
+    def bytes_usados(self):
+        """Bytes de las tablas por año más los de las combinaciones de varios años"""
+        return self._tablas.bytes_usados + self._bytes_combinados
+
+    def tabla(self, clave, cargar, fijar=False):
+        """Tabla Arrow de un año; `cargar()` devuelve un DataFrame o una tabla Arrow y solo se llama si falta"""
+        def cargar_tabla():
+            df = cargar()
+            if isinstance(df, pa.Table):
+                return df
+            if df.empty:
+                return pa.table({})
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+        return self._tablas.obtener(clave, cargar_tabla, fijar=fijar)
+
+    def vista(self, clave, cargar):
+        """DataFrame de solo lectura de un año, sin copiar los buffers de Arrow"""
+        return a_pandas(self.tabla(clave, cargar))
+
+    def prestar(self, cargadores):
+        """Fija los años indicados (``{clave: cargar}``) y devuelve un préstamo para la sesión"""
+        # Orden canónico: la misma selección en otro orden comparte la combinación
+        claves = tuple(sorted(cargadores, key=str))
+        tablas = {clave: self.tabla(clave, cargadores[clave], fijar=True) for clave in claves}
+        # Solo quedan fijados los años que se cargaron (una carga vacía no toma referencia)
+        fijadas = [clave for clave, t in tablas.items() if t.num_rows]
+        compartido = len(fijadas) == len(claves)
+
+        with self._candado:
+            if compartido and claves in self._combinados:
+                self._combinados[claves][1] += 1
+                return Prestamo(self, claves, fijadas)
+
+        # Un solo año se ve sin copia; varios se combinan una vez para todas las sesiones
+        presentes = [tablas[clave] for clave in fijadas]
+        if len(presentes) == 1:
+            combinado = a_pandas(presentes[0])
+        elif presentes:
+            combinado = a_pandas(pa.concat_tables(presentes, promote_options='permissive').combine_chunks())
+        else:
+            combinado = a_pandas(pa.table({}))
+
+        if not compartido:
+            return Prestamo(self, claves, fijadas, propio=[combinado, {}])
+
+        with self._candado:
+            if claves not in self._combinados:
+                # Las vistas de un solo año comparten los buffers de su tabla y no suman
+                tamaño = tamaño_en_bytes(combinado) if len(claves) > 1 else 0
+                self._combinados[claves] = [combinado, 0, {}, tamaño]
+                self._bytes_combinados += tamaño
+            self._combinados[claves][1] += 1
+        self._tablas.desalojar()
+        return Prestamo(self, claves, fijadas)
+
+    def _combinado(self, claves):
+        with self._candado:
+            df, _, derivados, _ = self._combinados[claves]
+            return df, derivados
+
+    def _soltar(self, claves, fijadas, compartido=True):
+        if compartido:
+            with self._candado:
+                entrada = self._combinados.get(claves)
+                if entrada is not None:
+                    entrada[1] -= 1
+                    if entrada[1] <= 0:
+                        del self._combinados[claves]
+                        self._bytes_combinados -= entrada[3]
+        for clave in fijadas:
+            self._tablas.soltar(clave)
@@ -0,0 +1,177 @@
+"""Lectura de los archivos enriquecidos de la ENIGH para el dashboard.
+
+Solo se leen las columnas que usan las páginas y, cuando el usuario fija filtros
+antes de cargar, estos se traducen a predicados de pyarrow para descartar grupos
+de filas completos sin llegar a decodificarlos. Después de derivar las columnas
+auxiliares, ``compactar_tipos`` reduce el DataFrame a tipos compactos para que
+varios años quepan en memoria al mismo tiempo.
+
+El pipeline de datos guarda ese resultado (columnas derivadas y tipos compactos)
+en una tabla de servicio versionada por año, ``enigh_{año}_servicio_v{N}.parquet``;
+cuando existe, el dashboard la lee directo a Arrow sin derivar ni convertir nada.
+Junto a ella queda una copia Arrow IPC (Feather v2) sin comprimir, ``.arrow``, que
+se mapea en memoria: abrirla no descomprime ni copia, y los procesos del servidor
+en la misma máquina comparten sus páginas a través de la caché del sistema operativo.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from enigh.catalogos import CONDICIONES_POBREZA, ENTIDADES_MEXICO, PERFILES_POBREZA
+
+# Cambiar al modificar las columnas derivadas o sus tipos: el nombre del archivo cambia
+VERSION_SERVICIO = 3
+
+# Columnas de la tabla enriquecida que realmente usa el dashboard
+COLUMNAS_DASHBOARD = [
+    'folioviv', 'entidad', 'celular', 'conex_inte',
+    'pobreza', 'pobreza_e', 'ict', 'ictpc', 'rururb', 'factor',
+    'ic_rezedu', 'ic_asalud', 'ic_segsoc', 'ic_cv', 'ic_sbv', 'ic_ali',
+    'gasto_celular', 'Jefatura_Mujer',
+    'est_dis', 'upm'  # diseño muestral, para los errores estándar
+]
+
+# Etiquetas con categorías fijas: así la concatenación de años conserva el tipo
+CATEGORIAS = {
+    'condicion_pobreza': CONDICIONES_POBREZA,
+    'Ambito': ['Urbano', 'Rural'],
+    'Jefatura_Hogar': ['Hombre', 'Mujer'],
+    'Entidad_Federativa': list(ENTIDADES_MEXICO.values()),
+    'Perfil_Pobreza': list(PERFILES_POBREZA.values()),
+}
+
+# Indicadores 0/1 o códigos pequeños: int8, o float32 si traen faltantes
+BANDERAS = [
+    'tiene_celular', 'tiene_internet', 'conexion_completa', 'Jefatura_Mujer',
+    'celular', 'conex_inte', 'rururb', 'pobreza', 'pobreza_e', 'entidad', 'cluster',
+    'ic_rezedu', 'ic_asalud', 'ic_segsoc', 'ic_cv', 'ic_sbv', 'ic_ali'
+]
+
+# Montos y pesos: float32 conserva ~7 cifras significativas, suficiente para pesos e ingresos
+CONTINUAS = ['factor', 'ict', 'ictpc', 'gasto_celular', 'pct_gasto_celular']
+
+# Condición de pobreza -> alternativas de predicados que la contienen
+PREDICADOS_POBREZA = {
+    'Pobreza Extrema': [[('pobreza_e', '==', 1)]],
+    'Pobreza Moderada': [[('pobreza', '==', 1)]],
+}
+
+# Ámbito -> predicado sobre rururb (CONEVAL: 1 rural, 0 urbano). Urbano es todo lo que
+# no es rural, como en derivar_columnas: 'not in' conserva los nulos (hogares sin cruce
+# con pobreza), que '==' y '!=' descartarían
+PREDICADOS_AMBITO = {
+    'Rural': ('rururb', '==', 1),
+    'Urbano': ('rururb', 'not in', [1]),
+}
+
+
+def filtros_pushdown(condiciones=None, entidades=None, ambitos=None):
+    """Traduce los filtros previos a la carga a predicados de pyarrow en forma disyuntiva
+
+    Los predicados describen un superconjunto de la selección (p. ej. 'Pobreza
+    Moderada' se lee como pobreza == 1), así que la condición exacta debe volver a
+    aplicarse sobre las columnas derivadas. Devuelve None si no hay nada que filtrar.
+    """
+    comunes = []
+    if entidades:
+        comunes.append(('entidad', 'in', sorted(int(e) for e in entidades)))
+    if ambitos and len(set(ambitos)) == 1:
+        comunes.append(PREDICADOS_AMBITO[ambitos[0]])
+
+    alternativas = [[]]
+    # 'No Pobre' no tiene un predicado que lo aísle, así que con él se lee todo
+    if condiciones and all(c in PREDICADOS_POBREZA for c in condiciones):
+        alternativas = [alt for c in sorted(set(condiciones)) for alt in PREDICADOS_POBREZA[c]]
+
+    filtros = [alt + comunes for alt in alternativas]
+    return filtros if filtros != [[]] else None
+
+
+def leer_enriquecido(ruta, filtros=None):
+    """Lee solo las columnas del dashboard, empujando los filtros a pyarrow"""
+    disponibles = set(pq.read_schema(ruta).names)
+    columnas = [c for c in COLUMNAS_DASHBOARD if c in disponibles]
+    return pd.read_parquet(ruta, columns=columnas, filters=filtros)
+
+
+def ruta_servicio(año, carpeta='data/procesados'):
+    return os.path.join(carpeta, f'enigh_{año}_servicio_v{VERSION_SERVICIO}.parquet')
+
+
+def ruta_servicio_arrow(año, carpeta='data/procesados'):
+    return os.path.join(carpeta, f'enigh_{año}_servicio_v{VERSION_SERVICIO}.arrow')
+
+
+def derivar_columnas(df, año):
+    """Agrega el año y las columnas auxiliares del dashboard (en el mismo DataFrame)"""
+    df['Año'] = año
+
+    df['tiene_celular'] = (df['celular'] == 1).astype(int)
+    df['tiene_internet'] = (df['conex_inte'] == 1).astype(int)
+    df['conexion_completa'] = ((df['celular'] == 1) & (df['conex_inte'] == 1)).astype(int)
+
+    df['condicion_pobreza'] = np.select(
+        [df['pobreza_e'] == 1, df['pobreza'] == 1],
+        ['Pobreza Extrema', 'Pobreza Moderada'], default='No Pobre'
+    )
+    df['Ambito'] = np.where(df['rururb'] == 1, 'Rural', 'Urbano')
+    df['Jefatura_Hogar'] = np.where(df['Jefatura_Mujer'] == 1, 'Mujer', 'Hombre')
+    df['Entidad_Federativa'] = df['entidad'].map(ENTIDADES_MEXICO)
+
+    # Gasto en celular como % del ingreso
+    df['pct_gasto_celular'] = np.where(
+        (df['ict'] > 0) & (df['ict'].notna()),
+        (df['gasto_celular'] / df['ict']) * 100, 0
+    )
+    return df
+
+
+def filtros_servicio(condiciones=None, entidades=None, ambitos=None):
+    """Filtros previos a la carga sobre las columnas derivadas de la tabla de servicio (exactos)"""
+    filtros = []
+    if condiciones:
+        filtros.append(('condicion_pobreza', 'in', sorted(set(condiciones))))
+    if entidades:
+        filtros.append(('entidad', 'in', sorted(int(e) for e in entidades)))
+    if ambitos:
+        filtros.append(('Ambito', 'in', sorted(set(ambitos))))
+    return [filtros] if filtros else None
+
+
+def leer_servicio(ruta, filtros=None):
+    """Tabla Arrow de servicio, lista para el almacén (sin pasar por pandas)"""
+    return pq.read_table(ruta, filters=filtros)
+
+
+def leer_servicio_mapeado(ruta, filtros=None):
+    """Tabla Arrow sobre la copia ``.arrow`` mapeada en memoria (sin copia ni descompresión)
+
+    Con filtros solo se copian las filas elegidas; sin ellos la tabla apunta al archivo.
+    """
+    tabla = feather.read_table(ruta, memory_map=True)
+    if filtros:
+        tabla = tabla.filter(pq.filters_to_expression(filtros))
+    return tabla
+
+
+def compactar_tipos(df):
+    """Convierte etiquetas a categóricas, banderas a int8 y montos a float32 (en el mismo DataFrame)"""
+    for col, categorias in CATEGORIAS.items():
+        if col in df.columns:
+            df[col] = pd.Categorical(df[col], categories=categorias)
+
+    for col in BANDERAS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32' if df[col].isna().any() else 'int8')
+
+    for col in CONTINUAS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+
+    if 'Año' in df.columns:
+        df['Año'] = df['Año'].astype('int16')
+
+    return df
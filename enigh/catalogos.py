@@ -0,0 +1,31 @@
+"""Catálogos de etiquetas compartidos por las páginas y la carga de datos."""
+
+# --- Diccionario de Entidades Federativas ---
+ENTIDADES_MEXICO = {
+    1: "Aguascalientes", 2: "Baja California", 3: "Baja California Sur", 4: "Campeche", 5: "Coahuila de Zaragoza",
+    6: "Colima", 7: "Chiapas", 8: "Chihuahua", 9: "Ciudad de México", 10: "Durango", 11: "Guanajuato",
+    12: "Guerrero", 13: "Hidalgo", 14: "Jalisco", 15: "México", 16: "Michoacán de Ocampo", 17: "Morelos",
+    18: "Nayarit", 19: "Nuevo León", 20: "Oaxaca", 21: "Puebla", 22: "Querétaro", 23: "Quintana Roo",
+    24: "San Luis Potosí", 25: "Sinaloa", 26: "Sonora", 27: "Tabasco", 28: "Tamaulipas", 29: "Tlaxcala",
+    30: "Veracruz de Ignacio de la Llave", 31: "Yucatán", 32: "Zacatecas"
+}
+
+NOMBRES_CARENCIAS = {
+    'ic_rezedu': 'Rezago Educativo',
+    'ic_asalud': 'Acceso a Salud', 
+    'ic_segsoc': 'Seguridad Social',
+    'ic_cv': 'Calidad de Vivienda',
+    'ic_sbv': 'Servicios Básicos',
+    'ic_ali': 'Alimentación'
+}
+
+# Perfiles del modelo K-Means de pobreza extrema (2024)
+PERFILES_POBREZA = {
+    0: "Aislamiento Rural Profundo", 
+    1: "Conectividad Precaria en el Campo",
+    2: "Pobreza Urbana Informal y Conectada", 
+    3: "Formales pero Vulnerables",
+    4: "Conectados con Acceso a Salud"
+}
+
+CONDICIONES_POBREZA = ['Pobreza Extrema', 'Pobreza Moderada', 'No Pobre']
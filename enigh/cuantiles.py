@@ -0,0 +1,83 @@
+"""Cuantiles ponderados por el factor de expansión (deciles, quintiles, percentiles...).
+
+Los hogares se ordenan por la variable y cada uno cae en el cuantil que le toca
+según el peso acumulado en el punto medio de su propio peso, de modo que cada
+grupo representa la misma fracción de la población expandida y no del número
+de registros. Los empates quedan siempre en el mismo cuantil.
+
+Para la página de exploración el orden de la columna se calcula una sola vez por
+conjunto de datos (``IndiceOrdenado``); cualquier selección de filas se ordena a
+partir de él en tiempo lineal, sin volver a ordenar ni copiar el DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+
+class IndiceOrdenado:
+    """Posiciones de las filas en orden ascendente de una columna (sin nulos)"""
+
+    def __init__(self, df, columna):
+        valores = df[columna].to_numpy(dtype='float64', na_value=np.nan)
+        self.n = len(valores)
+        orden = np.argsort(valores, kind='stable')
+        orden = orden[~np.isnan(valores[orden])]
+        self.orden = orden.astype(np.int32) if self.n < 2**31 else orden
+
+    @property
+    def nbytes(self):
+        return self.orden.nbytes
+
+    def ordenar(self, filas):
+        """Las `filas` de la selección, en orden de la columna y sin las que son nulas"""
+        seleccion = np.zeros(self.n, dtype=bool)
+        seleccion[filas] = True
+        return self.orden[seleccion[self.orden]]
+
+
+def codigos_cuantiles(valores, pesos, q):
+    """Cuantil (0 a q-1) de cada elemento de `valores`, que ya vienen ordenados"""
+    valores = np.asarray(valores, dtype='float64')
+    pesos = np.asarray(pesos, dtype='float64')
+    if len(valores) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    acumulado = np.cumsum(pesos)
+    codigos = np.floor((acumulado - pesos / 2) / acumulado[-1] * q).astype(np.int64)
+    np.clip(codigos, 0, q - 1, out=codigos)
+
+    # Los empates toman el cuantil del primero de su grupo
+    inicio = np.r_[True, valores[1:] != valores[:-1]]
+    return codigos[np.maximum.accumulate(np.where(inicio, np.arange(len(valores)), 0))]
+
+
+def cuantiles_ponderados(valores, pesos, q):
+    """Cuantil ponderado (0 a q-1, -1 para nulos) de cada elemento, en su orden original"""
+    valores = np.asarray(valores, dtype='float64')
+    pesos = np.asarray(pesos, dtype='float64')
+    orden = np.argsort(valores, kind='stable')
+    orden = orden[~np.isnan(valores[orden])]
+
+    codigos = np.full(len(valores), -1, dtype=np.int64)
+    codigos[orden] = codigos_cuantiles(valores[orden], pesos[orden], q)
+    return codigos
+
+
+def sumas_por_cuantil(df, posiciones, codigos, q, peso, columnas, nombre='Cuantil', etiquetas=None):
+    """Sumas ponderadas por cuantil, con el mismo formato que ``sumas_ponderadas``
+
+    `posiciones` son las filas de `df` a las que corresponden los `codigos`; solo
+    se leen esas filas de las columnas necesarias.
+    """
+    if etiquetas is None:
+        etiquetas = np.arange(1, q + 1)
+    else:
+        etiquetas = pd.Categorical(etiquetas, categories=etiquetas, ordered=True)
+
+    w = df[peso].to_numpy(dtype='float64')[posiciones]
+    sumas = pd.DataFrame({nombre: etiquetas})
+    sumas['registros'] = np.bincount(codigos, minlength=q)
+    sumas[peso] = np.bincount(codigos, weights=w, minlength=q)
+    for col in columnas:
+        x = df[col].to_numpy(dtype='float64', na_value=np.nan)[posiciones]
+        sumas[col] = np.bincount(codigos, weights=np.nan_to_num(x * w), minlength=q)
+    return sumas
@@ -0,0 +1,27 @@
+"""Cubo de sumas ponderadas para la página de exploración interactiva.
+
+Cada celda reúne a los hogares que comparten año, condición de pobreza, ámbito,
+jefatura, perfil y entidad, y guarda Σfactor y Σfactor·indicador. Cualquier
+combinación de filtros de la barra lateral se responde sumando celdas con
+``metricas_desde_sumas``, sin volver a recorrer los hogares.
+"""
+from enigh.ponderados import sumas_ponderadas
+
+# Dimensiones de baja cardinalidad que usa la barra lateral como filtros
+DIMENSIONES = [
+    'Año', 'condicion_pobreza', 'Ambito', 'Jefatura_Hogar',
+    'Perfil_Pobreza', 'Entidad_Federativa'
+]
+
+# Indicadores que se promedian con el factor de expansión
+INDICADORES = [
+    'tiene_celular', 'tiene_internet', 'conexion_completa', 'ictpc', 'pct_gasto_celular',
+    'ic_rezedu', 'ic_asalud', 'ic_segsoc', 'ic_cv', 'ic_sbv', 'ic_ali'
+]
+
+
+def construir_cubo(df, peso='factor'):
+    """Agrega los hogares por celda: registros, Σpeso y Σpeso·indicador"""
+    dimensiones = [d for d in DIMENSIONES if d in df.columns]
+    indicadores = [c for c in INDICADORES if c in df.columns]
+    return sumas_ponderadas(df, peso, dimensiones, indicadores)
@@ -0,0 +1,11 @@
+"""Preparación de las bases enriquecidas de la ENIGH a partir de los CSV de INEGI y CONEVAL.
+
+Cada corrida también recalcula ``data/procesados/agregados.json``, las series que
+muestran las páginas 01, 02 y 03.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m enigh.etl                    # todos los años
+    python -m enigh.etl --años 2022 2024   # solo algunos
+    python -m enigh.etl --solo-servicio    # tablas de servicio desde data/procesados
+"""
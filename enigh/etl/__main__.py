@@ -0,0 +1,61 @@
+"""Línea de comandos del pipeline: python -m enigh.etl [--años ...] [--forzar]"""
+import argparse
+import sys
+
+from enigh.agregados import construir_agregados
+from enigh.etl.clusters import exportar_modelo, verificar_modelo
+from enigh.etl.geometria import construir_geometria
+from enigh.etl.pipeline import AÑOS, construir_servicios, construir_todos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m enigh.etl',
+        description='Construye los archivos enigh_{año}_final_enriquecido.parquet'
+    )
+    parser.add_argument('--años', type=int, nargs='+', default=list(AÑOS),
+                        help='Años a construir (por defecto todos)')
+    parser.add_argument('--datos', default='data',
+                        help='Carpeta con las fuentes data/enigh_{año}/*.csv')
+    parser.add_argument('--salida', default='data/procesados',
+                        help='Carpeta de los parquet enriquecidos')
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Procesos en paralelo (por defecto uno por año, hasta el número de CPUs)')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Reconstruye aunque las fuentes no hayan cambiado')
+    parser.add_argument('--modelo', default='notebook',
+                        help='Carpeta con scaler_2024.joblib y kmeans_model_2024.joblib para asignar perfiles')
+    parser.add_argument('--verificar-modelo', action='store_true',
+                        help='Exporta el modelo a .npz y compara sus asignaciones con KMeans.predict')
+    parser.add_argument('--solo-servicio', action='store_true',
+                        help='Solo genera las tablas de servicio desde los parquet enriquecidos existentes')
+    parser.add_argument('--solo-geometria', action='store_true',
+                        help='Solo simplifica los contornos de data/geodata para los mapas')
+    args = parser.parse_args(argv)
+
+    if args.verificar_modelo:
+        exportar_modelo(args.modelo)
+        hogares, diferencias = verificar_modelo(args.modelo, f'{args.salida}/enigh_2024_clusters_pobreza_extrema.parquet')
+        print(f"Modelo NumPy contra KMeans.predict: {diferencias} diferencias en {hogares:,} hogares")
+        return 1 if diferencias else 0
+
+    # Contornos simplificados por nivel de zoom; solo se regeneran si cambió la fuente
+    for nivel, ruta in construir_geometria(forzar=args.forzar).items():
+        print(f"Geometría {nivel} en {ruta}")
+    if args.solo_geometria:
+        return 0
+
+    if args.solo_servicio:
+        construir_servicios(args.años, args.salida, args.forzar, carpeta_modelo=args.modelo)
+        resultado = {}
+    else:
+        resultado = construir_todos(args.años, args.datos, args.salida, args.procesos, args.forzar,
+                                    carpeta_modelo=args.modelo)
+
+    # Las series de las páginas 01-03 se recalculan siempre con los años presentes
+    print(f"Agregados de las páginas en {construir_agregados(args.salida)}")
+    return 1 if any(estado.startswith('error') for estado in resultado.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Asignación de perfiles de pobreza extrema a cualquier año con el modelo de 2024.
+
+El notebook de segmentación entrenó un K-Means (y su escalador) sobre los hogares
+en pobreza extrema de 2024 y los guardó en ``notebook/*.joblib``. El pipeline los
+exporta una vez a ``modelo_perfiles_2024.npz`` (medias, escalas y centroides) y
+asigna los clusters de cada año con el evaluador de NumPy de ``enigh.perfiles``:
+el número de cluster queda guardado en la tabla de servicio y ni el pipeline ni
+el dashboard necesitan scikit-learn para predecir.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from enigh.perfiles import ModeloPerfiles, asignar_clusters, matriz_variables
+
+CARPETA_MODELO = 'notebook'
+
+ARCHIVOS_MODELO = {'escalador': 'scaler_2024.joblib', 'kmeans': 'kmeans_model_2024.joblib'}
+
+ARCHIVO_EXPORTADO = 'modelo_perfiles_2024.npz'
+
+
+def rutas_modelo(carpeta=CARPETA_MODELO):
+    return {nombre: os.path.join(carpeta, archivo) for nombre, archivo in ARCHIVOS_MODELO.items()}
+
+
+def ruta_exportado(carpeta=CARPETA_MODELO):
+    return os.path.join(carpeta, ARCHIVO_EXPORTADO)
+
+
+def cargar_sklearn(carpeta=CARPETA_MODELO):
+    """(escalador, kmeans) guardados por el notebook; importa scikit-learn"""
+    import joblib
+    rutas = rutas_modelo(carpeta)
+    return joblib.load(rutas['escalador']), joblib.load(rutas['kmeans'])
+
+
+def exportar_modelo(carpeta=CARPETA_MODELO):
+    """Escribe ``modelo_perfiles_2024.npz`` desde los joblib del notebook"""
+    return ModeloPerfiles.desde_sklearn(*cargar_sklearn(carpeta)).guardar(ruta_exportado(carpeta))
+
+
+def cargar_modelo(carpeta=CARPETA_MODELO):
+    """Modelo exportado, regenerándolo si los joblib son más nuevos; None si no hay modelo"""
+    exportado = ruta_exportado(carpeta)
+    joblibs = [ruta for ruta in rutas_modelo(carpeta).values() if os.path.exists(ruta)]
+    if len(joblibs) == len(ARCHIVOS_MODELO) and (
+        not os.path.exists(exportado) or os.path.getmtime(exportado) < max(map(os.path.getmtime, joblibs))
+    ):
+        exportar_modelo(carpeta)
+    return ModeloPerfiles.cargar(exportado) if os.path.exists(exportado) else None
+
+
+def verificar_modelo(carpeta=CARPETA_MODELO, ruta_clusters='data/procesados/enigh_2024_clusters_pobreza_extrema.parquet'):
+    """Compara el evaluador de NumPy con ``KMeans.predict`` sobre los hogares del parquet de clusters
+
+    Devuelve ``(hogares, diferencias)``; ``diferencias`` debe ser 0.
+    """
+    escalador, kmeans = cargar_sklearn(carpeta)
+    modelo = ModeloPerfiles.cargar(ruta_exportado(carpeta))
+    df = pd.read_parquet(ruta_clusters)
+    X = matriz_variables(df, modelo.variables).dropna()
+    esperado = kmeans.predict(escalador.transform(X))
+    obtenido = asignar_clusters(df.loc[X.index].assign(pobreza_e=1), modelo)
+    return len(X), int(np.count_nonzero(obtenido != esperado))
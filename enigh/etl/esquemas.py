@@ -0,0 +1,86 @@
+"""Registro de esquemas de las tablas fuente de la ENIGH por año.
+
+Cada tabla declara solo las columnas que usa el pipeline y su tipo de Arrow, de
+modo que el lector CSV multihilo de pyarrow no infiere tipos para cientos de
+columnas y ``folioviv`` es siempre la misma llave de ancho fijo (int64, igual que
+en los parquet procesados y en el de clusters) en todos los años.
+
+Las columnas enteras no admiten faltantes: si aparece uno se detiene la carga en
+lugar de convertir la columna a flotante en silencio. Las que sí pueden venir
+vacías (indicadores de CONEVAL) se declaran como flotantes.
+"""
+import pyarrow as pa
+import pyarrow.csv as pv
+
+LLAVE = pa.int64()
+
+ESQUEMA_BASE = {
+    'hogares': {
+        'folioviv': LLAVE,
+        'foliohog': pa.int8(),
+        'celular': pa.int8(),
+        'conex_inte': pa.int8(),
+        'entidad': pa.int8(),
+        'est_dis': pa.int32(),
+        'upm': pa.int32(),
+        'factor': pa.int32(),  # factor de expansión del hogar
+    },
+    'pobreza': {
+        'folioviv': LLAVE,
+        'pobreza': pa.float64(),
+        'pobreza_e': pa.float64(),
+        'ict': pa.float64(),
+        'ictpc': pa.float64(),
+        'rururb': pa.float64(),
+        'ic_rezedu': pa.float64(),
+        'ic_asalud': pa.float64(),
+        'ic_segsoc': pa.float64(),
+        'ic_cv': pa.float64(),
+        'ic_sbv': pa.float64(),
+        'ic_ali': pa.float64(),
+    },
+    'gastos': {
+        'folioviv': LLAVE,
+        # clave y gasto_tri como texto: la clave conserva ceros a la izquierda
+        # y los montos no numéricos se descartan igual que con errors='coerce'
+        'clave': pa.string(),
+        'tipo_gasto': pa.string(),
+        'gasto_tri': pa.string(),
+    },
+    'poblacion': {
+        'folioviv': LLAVE,
+        'parentesco': pa.int16(),
+        'sexo': pa.int8(),
+    },
+}
+
+# Un esquema por levantamiento; si un año cambia columnas o tipos se ajusta aquí
+ESQUEMAS = {año: ESQUEMA_BASE for año in (2018, 2020, 2022, 2024)}
+
+
+def esquema(año, tabla):
+    """Columnas y tipos declarados para una tabla fuente de un año
+
+    Un año nuevo sin entrada propia usa el esquema del levantamiento más reciente.
+    """
+    año = max((a for a in ESQUEMAS if a <= int(año)), default=min(ESQUEMAS))
+    return ESQUEMAS[año][tabla]
+
+
+def opciones_conversion(año, tabla):
+    """Proyección y tipos para ``pyarrow.csv``"""
+    columnas = esquema(año, tabla)
+    return pv.ConvertOptions(include_columns=list(columnas), column_types=columnas)
+
+
+def leer_tabla(ruta, año, tabla):
+    """Lee una tabla fuente con el lector multihilo de pyarrow y la pasa a pandas"""
+    datos = pv.read_csv(
+        ruta,
+        read_options=pv.ReadOptions(use_threads=True),
+        convert_options=opciones_conversion(año, tabla),
+    )
+    for nombre, tipo in esquema(año, tabla).items():
+        if pa.types.is_integer(tipo) and datos[nombre].null_count:
+            raise ValueError(f"{ruta}: la columna entera '{nombre}' trae {datos[nombre].null_count} valores vacíos")
+    return datos.to_pandas()
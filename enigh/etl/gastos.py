@@ -0,0 +1,46 @@
+"""Gasto en celular por vivienda leído por bloques desde gastoshogar.csv.
+
+``gastoshogar.csv`` es la tabla más grande de la ENIGH, pero de ella solo se
+necesitan las filas de la clave de telefonía celular con ``tipo_gasto == 'G1'``.
+El archivo se recorre por bloques con ``pyarrow.csv.open_csv`` leyendo únicamente
+las cuatro columnas de su esquema; cada bloque se filtra en Arrow y se reduce a sumas por vivienda,
+así que la memoria máxima depende del tamaño de bloque y no del archivo.
+"""
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+from enigh.etl.esquemas import opciones_conversion
+
+TAMAÑO_BLOQUE = 16 << 20  # bytes de CSV por bloque
+
+
+def clave_gasto_celular(año):
+    """Clave del gasto en telefonía celular (cambió en el catálogo de 2024)"""
+    return '083201' if int(año) >= 2024 else 'F003'
+
+
+def gasto_celular_por_vivienda(ruta, año, tamaño_bloque=TAMAÑO_BLOQUE):
+    """Gasto mensual en celular por vivienda (Σ gasto_tri / 3), leyendo por bloques"""
+    lector = pv.open_csv(
+        ruta,
+        read_options=pv.ReadOptions(block_size=tamaño_bloque),
+        convert_options=opciones_conversion(año, 'gastos'),
+    )
+
+    clave = clave_gasto_celular(año)
+    parciales = []
+    for bloque in lector:
+        seleccion = pc.and_(pc.equal(bloque['clave'], clave), pc.equal(bloque['tipo_gasto'], 'G1'))
+        bloque = bloque.filter(seleccion)
+        if bloque.num_rows == 0:
+            continue
+        gasto_tri = pd.to_numeric(bloque['gasto_tri'].to_pandas(), errors='coerce')
+        parciales.append(gasto_tri.groupby(bloque['folioviv'].to_pandas()).sum())
+
+    if not parciales:
+        return pd.DataFrame({'folioviv': pd.Series(dtype='int64'), 'gasto_celular': pd.Series(dtype='float64')})
+
+    # Una vivienda puede quedar repartida entre bloques
+    agregado = pd.concat(parciales).groupby(level=0).sum()
+    return (agregado / 3).rename('gasto_celular').rename_axis('folioviv').reset_index()
@@ -0,0 +1,136 @@
+"""Simplificación de los contornos estatales para los mapas (``estados_{nivel}.json``).
+
+Cada anillo se simplifica con Douglas-Peucker a la tolerancia del nivel y sus
+coordenadas se redondean a la rejilla del mismo nivel (los vértices que caen en
+la misma celda se funden). Los anillos que quedan con menos de cuatro vértices
+(islas más pequeñas que la tolerancia) se descartan. El resultado usa como
+``id`` el código de entidad de ``ENTIDADES_MEXICO`` y guarda el recuadro
+(``bbox``) de cada entidad para acercar el mapa sin recorrer sus coordenadas.
+"""
+import json
+import os
+
+import numpy as np
+
+from enigh.catalogos import ENTIDADES_MEXICO
+from enigh.geografia import (
+    ARCHIVO_FUENTE, CARPETA_GEODATA, CLAVES_ISO, NIVELES, VERSION_GEOMETRIA, ruta_geometria
+)
+
+
+def douglas_peucker(puntos, tolerancia):
+    """Máscara de los vértices que conserva Douglas-Peucker (iterativo, sin recursión)"""
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[[0, -1]] = True
+    pendientes = [(0, len(puntos) - 1)]
+    while pendientes:
+        i, j = pendientes.pop()
+        if j - i < 2:
+            continue
+        segmento = puntos[j] - puntos[i]
+        relativos = puntos[i + 1:j] - puntos[i]
+        largo = np.hypot(*segmento)
+        if largo == 0:
+            # Anillo cerrado: el primer tramo se mide contra el vértice de inicio
+            distancias = np.hypot(relativos[:, 0], relativos[:, 1])
+        else:
+            distancias = np.abs(segmento[0] * relativos[:, 1] - segmento[1] * relativos[:, 0]) / largo
+        k = int(distancias.argmax())
+        if distancias[k] > tolerancia:
+            medio = i + 1 + k
+            conservar[medio] = True
+            pendientes.extend([(i, medio), (medio, j)])
+    return conservar
+
+
+def simplificar_anillo(anillo, tolerancia, decimales):
+    """Anillo simplificado y redondeado (lista de [lon, lat]), o None si colapsa"""
+    puntos = np.asarray(anillo, dtype='float64')[:, :2]
+    if tolerancia > 0:
+        puntos = puntos[douglas_peucker(puntos, tolerancia)]
+    puntos = np.round(puntos, decimales)
+    # Vértices consecutivos que cayeron en la misma celda de la rejilla
+    distintos = np.ones(len(puntos), dtype=bool)
+    distintos[1:] = (np.diff(puntos, axis=0) != 0).any(axis=1)
+    puntos = puntos[distintos]
+    if len(puntos) < 3:
+        return None
+    if (puntos[0] != puntos[-1]).any():
+        puntos = np.vstack([puntos, puntos[:1]])
+    return puntos.tolist() if len(puntos) >= 4 else None
+
+
+def simplificar_poligonos(poligonos, tolerancia, decimales):
+    """Lista de polígonos (exterior + huecos) sin los que colapsan"""
+    resultado = []
+    for poligono in poligonos:
+        exterior = simplificar_anillo(poligono[0], tolerancia, decimales)
+        if exterior is None:
+            continue
+        huecos = [simplificar_anillo(hueco, tolerancia, decimales) for hueco in poligono[1:]]
+        resultado.append([exterior] + [h for h in huecos if h is not None])
+    return resultado
+
+
+def simplificar_entidad(geometria, tolerancia, decimales):
+    """Geometría GeoJSON simplificada; si todo colapsa conserva el polígono más grande sin simplificar"""
+    poligonos = geometria['coordinates'] if geometria['type'] == 'MultiPolygon' else [geometria['coordinates']]
+    simplificados = simplificar_poligonos(poligonos, tolerancia, decimales)
+    if not simplificados:
+        mayor = max(poligonos, key=lambda p: len(p[0]))
+        simplificados = simplificar_poligonos([mayor], 0, decimales)
+    if len(simplificados) == 1:
+        return {'type': 'Polygon', 'coordinates': simplificados[0]}
+    return {'type': 'MultiPolygon', 'coordinates': simplificados}
+
+
+def recuadro(geometria):
+    """[lon_min, lat_min, lon_max, lat_max] de los anillos exteriores"""
+    poligonos = geometria['coordinates'] if geometria['type'] == 'MultiPolygon' else [geometria['coordinates']]
+    puntos = np.concatenate([np.asarray(p[0]) for p in poligonos])
+    return [*puntos.min(axis=0).tolist(), *puntos.max(axis=0).tolist()]
+
+
+def simplificar_estados(fuente, nivel):
+    """FeatureCollection del nivel, con ``id`` = código de entidad y ordenada por código"""
+    tolerancia, decimales = NIVELES[nivel]
+    entidades = []
+    for entidad in fuente['features']:
+        codigo = CLAVES_ISO[entidad['properties']['id']]
+        geometria = simplificar_entidad(entidad['geometry'], tolerancia, decimales)
+        entidades.append({
+            'type': 'Feature', 'id': codigo, 'bbox': recuadro(geometria),
+            'properties': {'nombre': ENTIDADES_MEXICO[codigo]}, 'geometry': geometria
+        })
+    entidades.sort(key=lambda e: e['id'])
+    return {'type': 'FeatureCollection', 'version': VERSION_GEOMETRIA, 'nivel': nivel, 'features': entidades}
+
+
+def geometria_vigente(carpeta=CARPETA_GEODATA):
+    """True si cada nivel está generado, con la versión actual y más nuevo que la fuente"""
+    fuente = os.path.join(carpeta, ARCHIVO_FUENTE)
+    for nivel in NIVELES:
+        ruta = ruta_geometria(nivel, carpeta)
+        if not os.path.exists(ruta) or os.path.getmtime(ruta) < os.path.getmtime(fuente):
+            return False
+        with open(ruta, encoding='utf-8') as f:
+            if json.load(f).get('version') != VERSION_GEOMETRIA:
+                return False
+    return True
+
+
+def construir_geometria(carpeta=CARPETA_GEODATA, forzar=False):
+    """Escribe ``estados_{nivel}.json`` para cada nivel; devuelve {nivel: ruta} de los generados"""
+    if not forzar and geometria_vigente(carpeta):
+        return {}
+    with open(os.path.join(carpeta, ARCHIVO_FUENTE), encoding='utf-8') as f:
+        fuente = json.load(f)
+
+    generados = {}
+    for nivel in NIVELES:
+        ruta = ruta_geometria(nivel, carpeta)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(simplificar_estados(fuente, nivel), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(ruta + '.tmp', ruta)
+        generados[nivel] = ruta
+    return generados
@@ -0,0 +1,222 @@
+"""Pipeline de preparación de datos (antes "SCRIPT MAESTRO" del notebook de análisis).
+
+Para cada año se unen a nivel hogar las bases de hogares, pobreza (CONEVAL), gasto
+en celular y jefatura femenina, y se guarda ``enigh_{año}_final_enriquecido.parquet``.
+Los años se procesan en paralelo y un manifiesto con el SHA-256 de los archivos de
+entrada permite saltar los años cuyas fuentes no cambiaron desde la última corrida.
+Junto a cada parquet enriquecido se genera la tabla de servicio del dashboard, con
+los perfiles de pobreza extrema asignados por el modelo de segmentación.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from enigh.etl.clusters import CARPETA_MODELO, cargar_modelo
+from enigh.etl.esquemas import leer_tabla
+from enigh.etl.gastos import gasto_celular_por_vivienda
+from enigh.etl.servicio import construir_servicio, servicio_vigente
+
+AÑOS = (2018, 2020, 2022, 2024)
+
+# Cambiar al modificar la lógica de preparación para forzar la reconstrucción
+VERSION_ETL = 2
+
+MANIFIESTO = 'manifiesto_etl.json'
+
+
+# --- 1. RUTAS Y HUELLAS DE LAS FUENTES ---
+
+def rutas_fuente(año, ruta_datos='data'):
+    """Archivos CSV de un año: data/enigh_{año}/hogares.csv, pobreza{aa}.csv, ..."""
+    ruta_base = os.path.join(ruta_datos, f'enigh_{año}')
+    return {
+        'hogares': os.path.join(ruta_base, 'hogares.csv'),
+        'pobreza': os.path.join(ruta_base, f'pobreza{str(año)[-2:]}.csv'),
+        'gastos': os.path.join(ruta_base, 'gastoshogar.csv'),
+        'poblacion': os.path.join(ruta_base, 'poblacion.csv'),
+    }
+
+
+def ruta_salida_año(año, ruta_salida='data/procesados'):
+    return os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet')
+
+
+def sha256_archivo(ruta, bloque=1 << 20):
+    """Huella del contenido de un archivo, leída por bloques"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def huella_año(año, ruta_datos='data'):
+    """Huellas de las fuentes de un año junto con la versión del pipeline"""
+    return {
+        'version': VERSION_ETL,
+        'fuentes': {nombre: sha256_archivo(ruta) for nombre, ruta in rutas_fuente(año, ruta_datos).items()},
+    }
+
+
+def leer_manifiesto(ruta_salida):
+    ruta = os.path.join(ruta_salida, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(ruta_salida, manifiesto):
+    ruta = os.path.join(ruta_salida, MANIFIESTO)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, sort_keys=True)
+    os.replace(temporal, ruta)
+
+
+# --- 2. PREPARACIÓN DE BASES A NIVEL HOGAR ---
+
+def preparar_jefatura(df_poblacion):
+    """Jefatura_Mujer = 1 si la persona jefa (parentesco 101) es mujer (sexo 2)"""
+    jefes = df_poblacion[df_poblacion['parentesco'] == 101]
+    return pd.DataFrame({
+        'folioviv': jefes['folioviv'].to_numpy(),
+        'Jefatura_Mujer': np.where(jefes['sexo'] == 2, 1, 0).astype(np.int8),
+    })
+
+
+def indexar_por_llave(df, nombre, llave='folioviv'):
+    """Una fila por llave (la primera), indexada por ella, con el reporte de duplicados"""
+    unicos = df.drop_duplicates(subset=llave)
+    reporte = {'tabla': nombre, 'filas': len(df), 'llaves': len(unicos), 'duplicadas': len(df) - len(unicos)}
+    return unicos.set_index(llave), reporte
+
+
+def unir_bases(df_hogares, tablas, llave='folioviv'):
+    """Agrega a `df_hogares` las columnas de las tablas a nivel vivienda, alineadas por llave
+
+    Cada tabla de `tablas` ({nombre: DataFrame}) se reduce a una fila por llave y se
+    ubica una sola vez en la llave de hogares; sus columnas se insertan en el mismo
+    DataFrame (sin copiar las demás). Sin gasto o sin jefa registrada se asume 0.
+    Devuelve el DataFrame y un reporte por tabla.
+    """
+    llaves = pd.Index(df_hogares[llave])
+    reportes = []
+
+    for nombre, tabla in tablas.items():
+        tabla, reporte = indexar_por_llave(tabla, nombre, llave)
+        repetidas = df_hogares.columns.intersection(tabla.columns)
+        if len(repetidas):
+            raise ValueError(f"La tabla '{nombre}' repite columnas de hogares: {list(repetidas)}")
+
+        posiciones = tabla.index.get_indexer(llaves)
+        reporte['sin_pareja'] = int((posiciones == -1).sum())
+        reportes.append(reporte)
+        for col in tabla.columns:
+            df_hogares[col] = take(tabla[col].to_numpy(), posiciones, allow_fill=True)
+
+    df_hogares['gasto_celular'] = df_hogares['gasto_celular'].fillna(0)
+    df_hogares['Jefatura_Mujer'] = df_hogares['Jefatura_Mujer'].fillna(0).astype(np.int8)
+    return df_hogares, reportes
+
+
+def describir_reporte(reporte):
+    return (f"{reporte['tabla']}: {reporte['filas']:,} filas, {reporte['llaves']:,} llaves únicas "
+            f"({reporte['duplicadas']:,} duplicadas descartadas), "
+            f"{reporte['sin_pareja']:,} hogares sin pareja")
+
+
+# --- 3. CONSTRUCCIÓN POR AÑO ---
+
+def construir_año(año, ruta_datos='data', ruta_salida='data/procesados', carpeta_modelo=CARPETA_MODELO):
+    """Lee las fuentes de un año (solo las columnas de su esquema), las une y guarda el parquet enriquecido
+
+    También regenera la tabla de servicio del año. Devuelve la ruta del parquet y
+    el reporte de llaves de cada tabla unida.
+    """
+    rutas = rutas_fuente(año, ruta_datos)
+    df_hogares = leer_tabla(rutas['hogares'], año, 'hogares')
+    df_pobreza = leer_tabla(rutas['pobreza'], año, 'pobreza')
+    df_poblacion = leer_tabla(rutas['poblacion'], año, 'poblacion')
+
+    df_final, reportes = unir_bases(df_hogares, {
+        'pobreza': df_pobreza,
+        'gastos': gasto_celular_por_vivienda(rutas['gastos'], año),  # por bloques, sin cargar el archivo
+        'jefatura': preparar_jefatura(df_poblacion),
+    })
+
+    os.makedirs(ruta_salida, exist_ok=True)
+    archivo = ruta_salida_año(año, ruta_salida)
+    temporal = archivo + '.tmp'
+    df_final.to_parquet(temporal)
+    os.replace(temporal, archivo)
+    del df_final
+
+    construir_servicio(año, ruta_salida, carpeta_modelo)
+    return archivo, reportes
+
+
+def construir_todos(años=AÑOS, ruta_datos='data', ruta_salida='data/procesados',
+                    procesos=None, forzar=False, informar=print, carpeta_modelo=CARPETA_MODELO):
+    """Construye los años pedidos en paralelo, saltando los que no cambiaron
+
+    Devuelve ``{año: 'construido' | 'sin cambios' | 'error: ...'}``.
+    """
+    manifiesto = leer_manifiesto(ruta_salida)
+    resultado = {}
+    pendientes = {}
+
+    for año in años:
+        huella = huella_año(año, ruta_datos)
+        previo = manifiesto.get(str(año))
+        if not forzar and previo == huella and os.path.exists(ruta_salida_año(año, ruta_salida)):
+            informar(f"{año}: sin cambios en las fuentes, se omite")
+            resultado[año] = 'sin cambios'
+            construir_servicios([año], ruta_salida, informar=informar, carpeta_modelo=carpeta_modelo)
+        else:
+            pendientes[año] = huella
+
+    if not pendientes:
+        return resultado
+
+    # El modelo se exporta a .npz aquí, una vez, y no en cada proceso
+    cargar_modelo(carpeta_modelo)
+    with ProcessPoolExecutor(max_workers=procesos or min(len(pendientes), os.cpu_count() or 1)) as ejecutor:
+        futuros = {
+            ejecutor.submit(construir_año, año, ruta_datos, ruta_salida, carpeta_modelo): año
+            for año in pendientes
+        }
+        for futuro in as_completed(futuros):
+            año = futuros[futuro]
+            try:
+                archivo, reportes = futuro.result()
+            except Exception as e:
+                informar(f"{año}: error - {e}")
+                resultado[año] = f'error: {e}'
+                continue
+            manifiesto[str(año)] = pendientes[año]
+            guardar_manifiesto(ruta_salida, manifiesto)
+            for reporte in reportes:
+                informar(f"{año}: {describir_reporte(reporte)}")
+            informar(f"{año}: guardado en {archivo}")
+            resultado[año] = 'construido'
+
+    return resultado
+
+
+def construir_servicios(años=AÑOS, ruta_salida='data/procesados', forzar=False, informar=print,
+                        carpeta_modelo=CARPETA_MODELO):
+    """Genera las tablas de servicio que falten (o estén viejas) desde los parquet enriquecidos
+
+    No necesita los CSV fuente: sirve para desplegar con solo ``data/procesados``.
+    """
+    for año in años:
+        if not os.path.exists(ruta_salida_año(año, ruta_salida)):
+            continue
+        if forzar or not servicio_vigente(año, ruta_salida, carpeta_modelo):
+            informar(f"{año}: tabla de servicio en {construir_servicio(año, ruta_salida, carpeta_modelo)}")
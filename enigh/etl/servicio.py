@@ -0,0 +1,65 @@
+"""Tablas de servicio del dashboard a partir de los parquet enriquecidos.
+
+La tabla de servicio trae ya las columnas derivadas (condición de pobreza, ámbito,
+entidad, indicadores...) con los tipos compactos que usa la página de exploración,
+de modo que cargar un año es una lectura directa y no se recalcula nada en cada
+proceso del servidor.
+
+Cada tabla se escribe dos veces: en parquet (compacto, para distribuir) y en Arrow
+IPC sin comprimir y en un solo lote, que el dashboard mapea en memoria y convierte
+a pandas sin copiar las columnas numéricas.
+
+Si el modelo de segmentación está disponible, los hogares en pobreza extrema de
+cada año llegan ya con su cluster y perfil asignados (ver ``enigh.etl.clusters``).
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from enigh.carga import (
+    compactar_tipos, derivar_columnas, leer_enriquecido, ruta_servicio, ruta_servicio_arrow
+)
+from enigh.catalogos import PERFILES_POBREZA
+from enigh.etl.clusters import CARPETA_MODELO, cargar_modelo, ruta_exportado, rutas_modelo
+from enigh.perfiles import asignar_clusters
+
+
+def construir_servicio(año, ruta_salida='data/procesados', carpeta_modelo=CARPETA_MODELO):
+    """Genera ``enigh_{año}_servicio_v{N}.parquet`` y su copia ``.arrow`` desde el parquet enriquecido"""
+    df = leer_enriquecido(os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet'))
+    derivar_columnas(df, año)
+
+    # Perfiles de pobreza extrema con el modelo de 2024; sin modelo quedan vacíos
+    modelo = cargar_modelo(carpeta_modelo)
+    df['cluster'] = np.nan if modelo is None else asignar_clusters(df, modelo)
+    df['Perfil_Pobreza'] = df['cluster'].map(PERFILES_POBREZA)
+    compactar_tipos(df)
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Primero la copia Arrow: el parquet es el que marca la tabla como vigente
+    arrow = ruta_servicio_arrow(año, ruta_salida)
+    feather.write_feather(tabla, arrow + '.tmp', compression='uncompressed',
+                          chunksize=max(tabla.num_rows, 1))
+    os.replace(arrow + '.tmp', arrow)
+
+    archivo = ruta_servicio(año, ruta_salida)
+    pq.write_table(tabla, archivo + '.tmp')
+    os.replace(archivo + '.tmp', archivo)
+    return archivo
+
+
+def servicio_vigente(año, ruta_salida='data/procesados', carpeta_modelo=CARPETA_MODELO):
+    """True si la tabla de servicio de la versión actual (parquet y ``.arrow``) existe y no es más vieja
+    que el enriquecido ni que el modelo de segmentación"""
+    fuentes = [os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet')]
+    modelo = [*rutas_modelo(carpeta_modelo).values(), ruta_exportado(carpeta_modelo)]
+    fuentes += [ruta for ruta in modelo if os.path.exists(ruta)]
+    ultima = max(os.path.getmtime(ruta) for ruta in fuentes)
+    return all(
+        os.path.exists(archivo) and os.path.getmtime(archivo) >= ultima
+        for archivo in (ruta_servicio(año, ruta_salida), ruta_servicio_arrow(año, ruta_salida))
+    )
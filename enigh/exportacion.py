@@ -0,0 +1,118 @@
+"""Exportación de la selección de hogares en CSV, Parquet (zstd) o Arrow.
+
+La selección no se convierte completa a texto en memoria: se recorre en bloques de
+filas, cada bloque pasa a Arrow y se escribe con el escritor incremental del
+formato a un archivo en disco, así que la copia intermedia nunca pasa de un bloque.
+
+Streamlit vuelve a llamar a la función de la descarga en cada clic. Los archivos
+terminados se guardan en una carpeta temporal (``CacheExportaciones``) con la firma
+de la selección (datos, filtros, columnas y formato): repetir una descarga solo
+lee el archivo, sin volver a escribirlo. La caché se acota por número de archivos
+y por bytes en disco, y desaloja los usados hace más tiempo.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Formato -> (tipo MIME, extensión)
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+}
+
+# Filas por bloque: acota la copia intermedia sin multiplicar las llamadas al escritor
+TAMAÑO_BLOQUE = 100_000
+
+# Límites de la caché de exportaciones en disco
+MAX_ARCHIVOS = 16
+MAX_BYTES_DISCO = 1024 ** 3
+
+
+def escritor(formato, destino, esquema):
+    """Escritor incremental de Arrow para el formato"""
+    if formato == 'csv':
+        return pv.CSVWriter(destino, esquema)
+    if formato == 'parquet':
+        return pq.ParquetWriter(destino, esquema, compression='zstd')
+    if formato == 'arrow':
+        return pa.ipc.new_file(destino, esquema)
+    raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+
+def escribir_bloques(df, filas, columnas, formato, destino, tamaño_bloque=TAMAÑO_BLOQUE):
+    """Escribe ``df[columnas]`` en las posiciones `filas`, bloque por bloque, en `destino`"""
+    datos = df[list(columnas)]
+    salida = None
+    for inicio in range(0, max(len(filas), 1), tamaño_bloque):
+        bloque = pa.Table.from_pandas(datos.take(filas[inicio:inicio + tamaño_bloque]), preserve_index=False)
+        if salida is None:
+            salida = escritor(formato, destino, bloque.schema)
+        salida.write_table(bloque)
+    salida.close()
+
+
+class CacheExportaciones:
+    """Archivos exportados en una carpeta temporal, con desalojo LRU por número y por bytes"""
+
+    def __init__(self, max_archivos=MAX_ARCHIVOS, max_bytes=MAX_BYTES_DISCO):
+        self.max_archivos = max_archivos
+        self.max_bytes = max_bytes
+        self.carpeta = tempfile.mkdtemp(prefix='enigh_exportaciones_')
+        self._archivos = OrderedDict()  # firma -> (ruta, bytes)
+        self._candado = threading.Lock()
+        atexit.register(shutil.rmtree, self.carpeta, True)
+
+    def leer(self, firma, escribir):
+        """Bytes del archivo de `firma`; `escribir(destino)` solo se llama si no está en la caché"""
+        archivo = self._abrir(firma)
+        if archivo is None:
+            # La escritura ocurre fuera del candado para no bloquear otras descargas
+            descriptor, ruta = tempfile.mkstemp(dir=self.carpeta)
+            with os.fdopen(descriptor, 'wb') as destino:
+                escribir(destino)
+            with self._candado:
+                if firma in self._archivos:  # otra sesión lo escribió mientras tanto
+                    os.remove(ruta)
+                else:
+                    self._archivos[firma] = (ruta, os.path.getsize(ruta))
+                    self._desalojar()
+            archivo = self._abrir(firma)
+        # Un archivo abierto sigue legible aunque se desaloje mientras se lee
+        with archivo:
+            return archivo.read()
+
+    def _abrir(self, firma):
+        with self._candado:
+            if firma not in self._archivos:
+                return None
+            self._archivos.move_to_end(firma)
+            return open(self._archivos[firma][0], 'rb')
+
+    def _desalojar(self):
+        """Borra los archivos menos usados hasta respetar los límites (conserva el más reciente)"""
+        total = sum(tamaño for _, tamaño in self._archivos.values())
+        while len(self._archivos) > 1 and (len(self._archivos) > self.max_archivos or total > self.max_bytes):
+            _, (ruta, tamaño) = self._archivos.popitem(last=False)
+            total -= tamaño
+            os.remove(ruta)
+
+
+def exportar(df, filas, columnas, formato, cache=None, firma=None, tamaño_bloque=TAMAÑO_BLOQUE):
+    """Bytes del archivo con la selección, escrito por bloques; con `cache` se reutiliza por `firma`"""
+    def escribir(destino):
+        escribir_bloques(df, filas, columnas, formato, destino, tamaño_bloque)
+
+    if cache is not None:
+        return cache.leer(firma, escribir)
+    with tempfile.TemporaryFile() as archivo:
+        escribir(archivo)
+        archivo.seek(0)
+        return archivo.read()
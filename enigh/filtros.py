@@ -0,0 +1,68 @@
+"""Índice de bitmaps para los filtros de la barra lateral.
+
+Para cada dimensión de filtro y cada uno de sus valores se guarda, una sola vez
+por conjunto de datos cargado, un bitmap empaquetado (un bit por hogar). Aplicar
+los filtros se reduce a unos cuantos OR dentro de cada dimensión y un AND entre
+dimensiones, y al final se obtiene una única selección de filas sin crear
+DataFrames intermedios.
+
+Los filtros se describen como ``{dimensión: valores permitidos}``; ``None`` entre
+los valores permite además los hogares con la dimensión vacía (p. ej. sin perfil).
+"""
+import numpy as np
+import pandas as pd
+
+
+class IndiceBitmap:
+    """Bitmaps empaquetados por valor de cada dimensión de filtro"""
+
+    def __init__(self, df, dimensiones):
+        self.n = len(df)
+        self._bytes = (self.n + 7) // 8
+        self._bitmaps = {}
+
+        for dim in dimensiones:
+            if dim not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[dim])
+            mapa = {valor: np.packbits(codigos == k) for k, valor in enumerate(valores)}
+            if (codigos == -1).any():
+                mapa[None] = np.packbits(codigos == -1)
+            self._bitmaps[dim] = mapa
+
+    @property
+    def nbytes(self):
+        return sum(b.nbytes for mapa in self._bitmaps.values() for b in mapa.values())
+
+    def valores(self, dim):
+        """Valores presentes en una dimensión (sin el vacío)"""
+        return [v for v in self._bitmaps.get(dim, {}) if v is not None]
+
+    def bitmap(self, filtros):
+        """Bitmap empaquetado de los hogares que cumplen todos los filtros"""
+        resultado = np.full(self._bytes, 0xFF, dtype=np.uint8)
+        for dim, permitidos in filtros.items():
+            mapa = self._bitmaps.get(dim, {})
+            union = np.zeros(self._bytes, dtype=np.uint8)
+            for valor in permitidos:
+                bits = mapa.get(valor)
+                if bits is not None:
+                    np.bitwise_or(union, bits, out=union)
+            np.bitwise_and(resultado, union, out=resultado)
+        return resultado
+
+    def seleccionar(self, filtros):
+        """Posiciones (ordenadas) de las filas que cumplen todos los filtros"""
+        return np.flatnonzero(np.unpackbits(self.bitmap(filtros), count=self.n))
+
+
+def mascara(tabla, filtros):
+    """Misma semántica que el índice, evaluada con isin (útil sobre las celdas del cubo)"""
+    resultado = pd.Series(True, index=tabla.index)
+    for dim, permitidos in filtros.items():
+        valores = [v for v in permitidos if v is not None]
+        cumple = tabla[dim].isin(valores)
+        if None in permitidos:
+            cumple |= tabla[dim].isna()
+        resultado &= cumple
+    return resultado
@@ -0,0 +1,45 @@
+"""Geometría simplificada de las entidades federativas para los mapas del dashboard.
+
+``data/geodata/mexico_estados.json`` trae los contornos a resolución completa
+(2.1 MB). El pipeline (``enigh.etl.geometria``) los simplifica una vez por nivel
+de zoom y redondea las coordenadas a la rejilla de ese nivel; cada nivel queda
+en ``estados_{nivel}.json`` con el código de ``ENTIDADES_MEXICO`` como ``id`` de
+cada entidad, así que un mapa solo necesita los 32 valores del indicador.
+"""
+import json
+import os
+
+CARPETA_GEODATA = os.path.join('data', 'geodata')
+
+ARCHIVO_FUENTE = 'mexico_estados.json'
+
+VERSION_GEOMETRIA = 1
+
+# Nivel -> (tolerancia de Douglas-Peucker, decimales de las coordenadas), en grados.
+# 'nacional' es el país completo; 'estatal' es el acercamiento a una entidad
+NIVELES = {
+    'nacional': (0.02, 2),
+    'estatal': (0.004, 3),
+}
+
+# Clave ISO 3166-2 del archivo fuente -> código de entidad del INEGI
+CLAVES_ISO = {
+    'MXAGU': 1, 'MXBCN': 2, 'MXBCS': 3, 'MXCAM': 4, 'MXCOA': 5, 'MXCOL': 6, 'MXCHP': 7, 'MXCHH': 8,
+    'MXCMX': 9, 'MXDUR': 10, 'MXGUA': 11, 'MXGRO': 12, 'MXHID': 13, 'MXJAL': 14, 'MXMEX': 15, 'MXMIC': 16,
+    'MXMOR': 17, 'MXNAY': 18, 'MXNLE': 19, 'MXOAX': 20, 'MXPUE': 21, 'MXQUE': 22, 'MXROO': 23, 'MXSLP': 24,
+    'MXSIN': 25, 'MXSON': 26, 'MXTAB': 27, 'MXTAM': 28, 'MXTLA': 29, 'MXVER': 30, 'MXYUC': 31, 'MXZAC': 32
+}
+
+
+def ruta_geometria(nivel, carpeta=CARPETA_GEODATA):
+    return os.path.join(carpeta, f'estados_{nivel}.json')
+
+
+def leer_geometria(nivel='nacional', carpeta=CARPETA_GEODATA):
+    """FeatureCollection del nivel (``id`` = código de entidad), o None si no se ha generado"""
+    ruta = ruta_geometria(nivel, carpeta)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        geometria = json.load(f)
+    return geometria if geometria.get('version') == VERSION_GEOMETRIA else None
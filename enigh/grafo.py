@@ -0,0 +1,87 @@
+"""Grafo de cálculos con memoización por nodo para las páginas del dashboard.
+
+Streamlit vuelve a ejecutar toda la página con cada cambio de un widget. El grafo
+declara de qué entradas (valores de widgets, llaves de datos) depende cada cálculo
+y guarda sus resultados según la firma exacta de esas entradas: en cada ejecución
+solo se recalculan los nodos que quedan aguas abajo de lo que cambió. Los
+resultados viven en un diccionario persistente (normalmente ``st.session_state``).
+
+Ejemplo::
+
+    grafo = Grafo(st.session_state.setdefault('grafo', {}))
+    grafo.entrada('filtros', filtros_activos)
+
+    @grafo.nodo('celdas', ['filtros'])
+    def _(filtros):
+        return cubo[mascara(cubo, filtros)]
+
+    celdas = grafo['celdas']
+"""
+from collections import OrderedDict
+
+
+def congelar(valor):
+    """Convierte listas, conjuntos y diccionarios en tuplas para usarlos como firma"""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    if isinstance(valor, (set, frozenset)):
+        return tuple(sorted(congelar(v) for v in valor))
+    if hasattr(valor, 'item') and getattr(valor, 'ndim', None) == 0:  # escalares de NumPy
+        return valor.item()
+    return valor
+
+
+class Grafo:
+    """Nodos de cálculo memoizados según la firma exacta de sus dependencias"""
+
+    def __init__(self, memoria):
+        self._memoria = memoria  # nombre -> OrderedDict(firma -> valor)
+        self._entradas = {}      # nombre -> (valor, firma)
+        self._nodos = {}         # nombre -> (funcion, dependencias, max_entradas)
+        self._firmas = {}        # firmas ya resueltas en esta ejecución
+        self.recalculados = []
+
+    def entrada(self, nombre, valor, firma=None):
+        """Registra una entrada; los objetos no comparables deben traer su propia `firma`"""
+        self._entradas[nombre] = (valor, congelar(valor) if firma is None else firma)
+        self._firmas.clear()
+
+    def nodo(self, nombre, dependencias, max_entradas=4):
+        """Decorador que registra `funcion(*valores_de_dependencias)` como nodo
+
+        `max_entradas` limita cuántos resultados se recuerdan (1 para los pesados).
+        """
+        def registrar(funcion):
+            self._nodos[nombre] = (funcion, list(dependencias), max_entradas)
+            self._firmas.clear()
+            return funcion
+        return registrar
+
+    def firma(self, nombre):
+        """Firma exacta de un nodo o entrada: cambia solo si cambia algo aguas arriba"""
+        if nombre in self._entradas:
+            return self._entradas[nombre][1]
+        if nombre not in self._firmas:
+            _, dependencias, _ = self._nodos[nombre]
+            self._firmas[nombre] = (nombre, tuple(self.firma(d) for d in dependencias))
+        return self._firmas[nombre]
+
+    def __getitem__(self, nombre):
+        if nombre in self._entradas:
+            return self._entradas[nombre][0]
+
+        funcion, dependencias, max_entradas = self._nodos[nombre]
+        firma = self.firma(nombre)
+        memo = self._memoria.setdefault(nombre, OrderedDict())
+        if firma in memo:
+            memo.move_to_end(firma)
+            return memo[firma]
+
+        valor = funcion(*(self[d] for d in dependencias))
+        self.recalculados.append(nombre)
+        memo[firma] = valor
+        while len(memo) > max_entradas:
+            memo.popitem(last=False)
+        return valor
@@ -0,0 +1,76 @@
+"""Histogramas ponderados precalculados por celda del cubo.
+
+En lugar de mandar al navegador cada valor de la selección (``px.histogram``), los
+hogares se agrupan una sola vez por conjunto de datos en intervalos fijos y por
+celda de las dimensiones de filtro, sumando el factor de expansión. El histograma
+de cualquier selección es la suma de las filas de sus celdas; al navegador solo
+llegan los bordes y las alturas de las barras, sin importar cuántos hogares haya.
+"""
+import numpy as np
+import pandas as pd
+
+from enigh.filtros import mascara
+
+
+def bordes_finos(valores, n=500, cuantil=0.995):
+    """Intervalos finos del mínimo al cuantil indicado, más uno abierto para la cola"""
+    valores = pd.Series(valores, dtype='float64').dropna()
+    if valores.empty:
+        return np.array([0.0, 1.0, np.inf])
+    minimo, maximo = valores.min(), valores.quantile(cuantil)
+    if maximo <= minimo:
+        maximo = minimo + 1
+    return np.r_[np.linspace(minimo, maximo, n + 1), np.inf]
+
+
+class HistogramasPorCelda:
+    """Σfactor por intervalo de `columna` para cada combinación de las dimensiones"""
+
+    def __init__(self, df, dimensiones, columna, bordes, peso='factor'):
+        dimensiones = [d for d in dimensiones if d in df.columns]
+        self.bordes = np.asarray(bordes, dtype='float64')
+        n_intervalos = len(self.bordes) - 1
+
+        grupos = df.groupby(dimensiones, dropna=False, observed=True, sort=True)
+        self.celdas = grupos.size().reset_index()[dimensiones]
+        celda = grupos.ngroup().to_numpy()
+
+        valores = df[columna].to_numpy(dtype='float64', na_value=np.nan)
+        intervalo = np.searchsorted(self.bordes, valores, side='right') - 1
+        validos = (intervalo >= 0) & (intervalo < n_intervalos) & ~np.isnan(valores)
+
+        self.conteos = np.bincount(
+            celda[validos] * n_intervalos + intervalo[validos],
+            weights=df[peso].to_numpy(dtype='float64')[validos],
+            minlength=len(self.celdas) * n_intervalos
+        ).reshape(len(self.celdas), n_intervalos).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.conteos.nbytes + self.bordes.nbytes
+
+    def histograma(self, filtros):
+        """Σfactor por intervalo de los hogares que cumplen los filtros"""
+        return self.conteos[mascara(self.celdas, filtros)].sum(axis=0, dtype='float64')
+
+
+def agrupar_intervalos(bordes, conteos, n_barras, cuantil=None):
+    """Une intervalos contiguos en a lo más `n_barras` barras
+
+    Con `cuantil` se descarta la cola por encima de ese cuantil ponderado (con la
+    resolución de los intervalos originales), p. ej. 0.95 para quitar extremos.
+    """
+    bordes = np.asarray(bordes, dtype='float64')
+    conteos = np.asarray(conteos, dtype='float64')
+
+    fin = len(conteos)
+    if cuantil is not None and conteos.sum() > 0:
+        acumulado = np.cumsum(conteos)
+        fin = int(np.searchsorted(acumulado, cuantil * acumulado[-1])) + 1
+    if np.isinf(bordes[fin]):
+        fin -= 1  # la cola abierta no se dibuja
+    fin = max(fin, 1)
+
+    paso = int(np.ceil(fin / n_barras))
+    inicios = np.arange(0, fin, paso)
+    return np.r_[bordes[inicios], bordes[fin]], np.add.reduceat(conteos[:fin], inicios)
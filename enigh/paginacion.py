@@ -0,0 +1,84 @@
+"""Tabla de detalle paginada: búsqueda, orden y páginas calculados en el servidor.
+
+El navegador solo recibe las filas de la página visible. El orden de cada
+columna (``OrdenColumna``) se calcula una vez por conjunto de datos, con los
+nulos al final; ordenar una selección es quedarse con sus filas en ese orden,
+en tiempo lineal. La búsqueda de texto compara contra las categorías de la
+columna (32 entidades, 5 perfiles) y no contra cada hogar.
+"""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+TAMAÑOS_PAGINA = [25, 50, 100, 500]
+
+# Columnas en las que busca el cuadro de texto
+COLUMNAS_BUSQUEDA = ['Entidad_Federativa', 'Perfil_Pobreza']
+
+
+class OrdenColumna:
+    """Posiciones de todas las filas en orden ascendente de una columna, con los nulos al final"""
+
+    def __init__(self, df, columna):
+        serie = df[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Orden de las categorías (p. ej. Pobreza Extrema < Moderada < No Pobre)
+            clave = serie.cat.codes.to_numpy().astype('float64')
+            clave[clave < 0] = np.nan
+        elif pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype):
+            clave = serie.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            codigos, _ = pd.factorize(serie, sort=True)
+            clave = np.where(codigos < 0, np.nan, codigos)
+        self.n = len(clave)
+        orden = np.argsort(clave, kind='stable')  # NaN al final
+        self.nulos = np.isnan(clave[orden])
+        self.orden = orden.astype(np.int32) if self.n < 2**31 else orden
+
+    @property
+    def nbytes(self):
+        return self.orden.nbytes + self.nulos.nbytes
+
+    def ordenar(self, filas, descendente=False):
+        """Las `filas` de la selección en el orden de la columna; los nulos siempre al final"""
+        seleccion = np.zeros(self.n, dtype=bool)
+        seleccion[filas] = True
+        elegidas = seleccion[self.orden]
+        validas = self.orden[elegidas & ~self.nulos]
+        nulas = self.orden[elegidas & self.nulos]
+        return np.concatenate([validas[::-1] if descendente else validas, nulas])
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos, para que 'mexico' encuentre 'México'"""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def coincidencias(df, texto, columnas=COLUMNAS_BUSQUEDA):
+    """Máscara (sobre todas las filas) de los hogares cuyo valor en alguna columna contiene `texto`"""
+    buscado = normalizar(texto.strip())
+    mascara = np.zeros(len(df), dtype=bool)
+    for columna in columnas:
+        if columna not in df.columns:
+            continue
+        serie = df[columna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos, categorias = serie.cat.codes.to_numpy(), serie.cat.categories
+        else:
+            codigos, categorias = pd.factorize(serie)
+        encontradas = [i for i, valor in enumerate(categorias) if buscado in normalizar(valor)]
+        mascara |= np.isin(codigos, encontradas)
+    return mascara
+
+
+def total_paginas(filas, tamaño):
+    """Número de páginas de `filas` (al menos una, aunque la selección esté vacía)"""
+    return max(1, -(-len(filas) // tamaño))
+
+
+def pagina(filas, numero, tamaño):
+    """Posiciones de la página `numero` (desde 1; fuera de rango se ajusta a la última o la primera)"""
+    numero = min(max(numero, 1), total_paginas(filas, tamaño))
+    return filas[(numero - 1) * tamaño:numero * tamaño]
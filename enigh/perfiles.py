@@ -0,0 +1,88 @@
+"""Asignación de perfiles de pobreza extrema con NumPy, sin scikit-learn.
+
+Predecir con el K-Means de 2024 es estandarizar las 10 variables y quedarse con
+el centroide más cercano. Por eso el escalador y el modelo se exportan a un
+``.npz`` pequeño (medias, escalas y centroides), y la asignación es un solo
+producto de matrices por lote:
+``‖x - c‖² = ‖x‖² - 2·x·c + ‖c‖²``, y como ``‖x‖²`` no cambia entre centroides,
+basta el argmin de ``‖c‖² - 2·x·c`` (el mismo cálculo que ``KMeans.predict``).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Variables del modelo, en el orden en que se entrenó el escalador
+VARIABLES_MODELO = [
+    'ictpc', 'ic_rezedu', 'ic_asalud', 'ic_segsoc', 'ic_cv',
+    'ic_sbv', 'ic_ali', 'Jefatura_Mujer', 'rururb', 'tiene_celular'
+]
+
+ARCHIVO_MODELO = os.path.join('notebook', 'modelo_perfiles_2024.npz')
+
+# Hogares por lote: acota la matriz de distancias sin perder la vectorización
+TAMAÑO_LOTE = 50_000
+
+
+class ModeloPerfiles:
+    """Estandarización y centroides del K-Means, listos para asignar lotes de hogares"""
+
+    def __init__(self, medias, escalas, centroides, variables=VARIABLES_MODELO):
+        self.medias = np.asarray(medias, dtype='float64')
+        self.escalas = np.asarray(escalas, dtype='float64')
+        self.centroides = np.asarray(centroides, dtype='float64')
+        self.variables = [str(v) for v in variables]
+        # ‖c‖² y los centroides transpuestos, calculados una vez
+        self._normas = (self.centroides ** 2).sum(axis=1)
+        self._transpuestos = np.ascontiguousarray(self.centroides.T)
+
+    @classmethod
+    def desde_sklearn(cls, escalador, kmeans):
+        variables = getattr(escalador, 'feature_names_in_', VARIABLES_MODELO)
+        return cls(escalador.mean_, escalador.scale_, kmeans.cluster_centers_, variables)
+
+    @classmethod
+    def cargar(cls, ruta=ARCHIVO_MODELO):
+        with np.load(ruta) as arreglos:
+            return cls(arreglos['medias'], arreglos['escalas'], arreglos['centroides'], arreglos['variables'])
+
+    def guardar(self, ruta=ARCHIVO_MODELO):
+        temporal = f'{ruta}.{os.getpid()}.tmp.npz'
+        np.savez(temporal, medias=self.medias, escalas=self.escalas,
+                 centroides=self.centroides, variables=np.array(self.variables))
+        os.replace(temporal, ruta)
+        return ruta
+
+    def predecir(self, X):
+        """Cluster (int) de cada fila de una matriz con las variables en el orden del modelo"""
+        X = (np.asarray(X, dtype='float64') - self.medias) / self.escalas
+        distancias = X @ self._transpuestos
+        distancias *= -2
+        distancias += self._normas
+        return distancias.argmin(axis=1)
+
+
+def cargar_modelo(ruta=ARCHIVO_MODELO):
+    """Modelo exportado, o None si el archivo no existe"""
+    return ModeloPerfiles.cargar(ruta) if os.path.exists(ruta) else None
+
+
+def matriz_variables(df, variables=VARIABLES_MODELO):
+    """Variables del modelo para todos los hogares (tiene_celular sale de `celular` si falta)"""
+    columnas = {
+        c: (df[c] if c in df.columns else (df['celular'] == 1).astype(int))
+        for c in variables
+    }
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def asignar_clusters(df, modelo, tamaño_lote=TAMAÑO_LOTE):
+    """Cluster (float32) de cada hogar en pobreza extrema con variables completas; NaN en los demás"""
+    X = matriz_variables(df, modelo.variables).to_numpy(dtype='float64', na_value=np.nan)
+    elegibles = np.flatnonzero((df['pobreza_e'] == 1).to_numpy() & ~np.isnan(X).any(axis=1))
+
+    clusters = np.full(len(df), np.nan, dtype='float32')
+    for inicio in range(0, len(elegibles), tamaño_lote):
+        filas = elegibles[inicio:inicio + tamaño_lote]
+        clusters[filas] = modelo.predecir(X[filas])
+    return clusters
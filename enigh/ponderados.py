@@ -0,0 +1,70 @@
+"""Motor de agregaciones ponderadas por el factor de expansión.
+
+En lugar de ``groupby(...).apply(lambda x: pd.Series({...}))``, que ejecuta una
+función de Python y construye una Serie por grupo, se precalculan los productos
+peso·columna y se agregan todos juntos con un único ``groupby().sum()``. Las
+métricas (media, proporción o total ponderado) se obtienen después como
+cocientes de esas sumas, por lo que también pueden calcularse a partir de sumas
+ya agregadas, como las celdas del cubo.
+"""
+import pandas as pd
+
+MEDIA = 'media'
+PROPORCION = 'proporcion'
+TOTAL = 'total'
+
+
+def sumas_ponderadas(df, peso, por, columnas, dropna=False):
+    """Registros, Σpeso y Σpeso·columna por grupo en una sola pasada
+
+    Sin columnas de agrupación devuelve una sola fila con los totales. Por
+    defecto se conservan los grupos con llave nula (p. ej. hogares sin perfil).
+    """
+    por = [por] if isinstance(por, str) else list(por or [])
+    sumas = df[por].copy()
+    sumas['registros'] = 1
+    sumas[peso] = df[peso].astype('float64')
+    for col in columnas:
+        sumas[col] = df[col] * sumas[peso]
+
+    if not por:
+        return sumas.sum().to_frame().T
+
+    return sumas.groupby(por, dropna=dropna, observed=True, sort=True).sum().reset_index()
+
+
+def metricas_desde_sumas(sumas, peso, metricas, por=None):
+    """Calcula las métricas a partir de sumas ponderadas, reagrupándolas si se indica `por`
+
+    `metricas` es un diccionario ``{nombre: (tipo, columna)}`` donde el tipo es
+    MEDIA (Σpeso·x / Σpeso), PROPORCION (la misma razón en porcentaje) o TOTAL
+    (Σpeso·x, o Σpeso si la columna es el propio peso).
+    """
+    columnas = ['registros', peso] + sorted({col for _, col in metricas.values() if col != peso})
+    por = [por] if isinstance(por, str) else list(por or [])
+
+    if por:
+        sumas = sumas.groupby(por, dropna=False, observed=True, sort=True)[columnas].sum().reset_index()
+        resultado = sumas[por].copy()
+    else:
+        sumas = sumas[columnas].sum().to_frame().T
+        resultado = pd.DataFrame(index=sumas.index)
+
+    for nombre, (tipo, col) in metricas.items():
+        if tipo == TOTAL:
+            resultado[nombre] = sumas[col]
+        elif tipo == MEDIA:
+            resultado[nombre] = sumas[col] / sumas[peso]
+        elif tipo == PROPORCION:
+            resultado[nombre] = sumas[col] / sumas[peso] * 100
+        else:
+            raise ValueError(f"Tipo de métrica desconocido: {tipo}")
+
+    return resultado
+
+
+def agregar_ponderado(df, peso, por, metricas, dropna=False):
+    """Métricas ponderadas de `df` por grupo con un único groupby().sum()"""
+    columnas = sorted({col for _, col in metricas.values() if col != peso})
+    sumas = sumas_ponderadas(df, peso, por, columnas, dropna=dropna)
+    return metricas_desde_sumas(sumas, peso, metricas, por)
@@ -0,0 +1,334 @@
+"""Selección del número de perfiles (K) para la segmentación de pobreza extrema.
+
+Sustituye la celda del codo de ``notebook/Modelo Segmentación.ipynb``, que ajusta
+``KMeans(n_clusters=k, n_init=10)`` de k=1 a 10 uno tras otro. Aquí cada K se
+ajusta en su propio proceso, con ``MiniBatchKMeans`` cuando hay muchos hogares, y
+se reporta la inercia (simple y ponderada con el factor de expansión) y la
+silueta sobre una muestra estratificada por cluster.
+
+Los resultados se guardan por (variables, huella de los datos, K): repetir el
+barrido con los mismos datos no ajusta nada, y al cambiar las variables o los datos
+solo se ajustan los K nuevos. Cada ajuste parte siempre de cero (varias
+inicializaciones y el factor como peso), así que el resultado de un (variables,
+datos, K) no depende de lo que ya hubiera en la caché.
+
+El entrenamiento usa el factor de expansión como peso de cada hogar (en el
+notebook solo se usaba después, para medir los clusters) y tiene una variante por
+bloques con ``MiniBatchKMeans.partial_fit`` que segmenta varios años apilados, o
+todos los hogares en pobreza, sin tener la matriz completa en memoria. Los tamaños
+ponderados de cada perfil por año quedan en ``segmentacion_{grupo}.json``; los de
+pobreza extrema pasan a las series de la página 03. Solo el grupo de pobreza
+extrema se alinea con el modelo de 2024 y toma los nombres de ``PERFILES_POBREZA``;
+los demás grupos numeran sus perfiles.
+
+Uso (desde la raíz del repositorio):
+    python -m enigh.segmentacion barrido --años 2024 --k 1 10
+    python -m enigh.segmentacion entrenar --años 2018 2020 2022 2024 --grupo extrema
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow.parquet as pq
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from enigh.agregados import ARCHIVO_SEGMENTACION, construir_agregados
+from enigh.carga import derivar_columnas, leer_enriquecido
+from enigh.catalogos import PERFILES_POBREZA
+from enigh.perfiles import VARIABLES_MODELO, ModeloPerfiles, cargar_modelo, matriz_variables
+
+ARCHIVO_BARRIDO = 'barrido_k.json'
+
+# Se incrementa cuando cambia cómo se ajusta cada K (invalida la caché anterior)
+VERSION_BARRIDO = 2
+
+# A partir de estos hogares se usa MiniBatchKMeans
+UMBRAL_MINIBATCH = 100_000
+
+TAMAÑO_MUESTRA_SILUETA = 3_000
+
+# Grupo de hogares -> máscara (pobreza incluye a la pobreza extrema, como en CONEVAL)
+GRUPOS_SEGMENTACION = {
+    'extrema': lambda df: df['pobreza_e'] == 1,
+    'pobreza': lambda df: df['pobreza'] == 1,
+}
+
+# Filas leídas por bloque al entrenar, épocas sobre todos los bloques y muestra para iniciar
+TAMAÑO_BLOQUE = 50_000
+EPOCAS = 5
+MUESTRA_POR_BLOQUE = 2_000
+
+
+# --- 1. DATOS DEL MODELO ---
+
+def datos_segmentacion(años=(2024,), ruta_salida='data/procesados', variables=VARIABLES_MODELO):
+    """Hogares en pobreza extrema con variables completas: (X sin escalar, factor)"""
+    marcos = []
+    for año in años:
+        df = leer_enriquecido(os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet'))
+        derivar_columnas(df, año)
+        extrema = df[df['pobreza_e'] == 1]
+        X = matriz_variables(extrema, variables).assign(factor=extrema['factor']).dropna()
+        marcos.append(X)
+    X = np.concatenate([m[list(variables)].to_numpy(dtype='float64') for m in marcos])
+    pesos = np.concatenate([m['factor'].to_numpy(dtype='float64') for m in marcos])
+    return X, pesos
+
+
+def huella_datos(X, pesos):
+    """SHA-256 de la matriz y los pesos: cambia con cualquier dato o variable"""
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(X).tobytes())
+    h.update(np.ascontiguousarray(pesos).tobytes())
+    return h.hexdigest()[:16]
+
+
+# --- 2. AJUSTE DE UN K ---
+
+def muestra_estratificada(etiquetas, n, semilla=42):
+    """Posiciones de una muestra de ~n filas con la misma proporción de cada cluster (al menos 2 por cluster)"""
+    rng = np.random.default_rng(semilla)
+    if len(etiquetas) <= n:
+        return np.arange(len(etiquetas))
+    posiciones = []
+    for etiqueta in np.unique(etiquetas):
+        grupo = np.flatnonzero(etiquetas == etiqueta)
+        tamaño = min(len(grupo), max(2, round(n * len(grupo) / len(etiquetas))))
+        posiciones.append(rng.choice(grupo, tamaño, replace=False))
+    return np.sort(np.concatenate(posiciones))
+
+
+def ajustar_k(X, pesos, k, minibatch=False, semilla=42, tamaño_muestra=TAMAÑO_MUESTRA_SILUETA):
+    """Ajusta K clusters ponderados por el factor y mide inercia, inercia ponderada y silueta"""
+    clase = MiniBatchKMeans if minibatch else KMeans
+    opciones = {'batch_size': 4096} if minibatch else {}
+    modelo = clase(n_clusters=k, n_init=3 if minibatch else 10, random_state=semilla, **opciones)
+    # Mismo peso que en el entrenamiento (entrenar_por_bloques): el K se elige para ese modelo
+    etiquetas = modelo.fit_predict(X, sample_weight=pesos)
+
+    distancias = ((X - modelo.cluster_centers_[etiquetas]) ** 2).sum(axis=1)
+    silueta = np.nan
+    if 1 < k < len(X):
+        muestra = muestra_estratificada(etiquetas, tamaño_muestra, semilla)
+        if len(np.unique(etiquetas[muestra])) > 1:
+            silueta = float(silhouette_score(X[muestra], etiquetas[muestra]))
+    return {
+        'k': k,
+        'inercia': float(distancias.sum()),
+        'inercia_ponderada': float((pesos * distancias).sum()),
+        'silueta': silueta,
+    }
+
+
+# --- 3. BARRIDO CON CACHÉ ---
+
+def leer_barrido(ruta_salida):
+    try:
+        with open(os.path.join(ruta_salida, ARCHIVO_BARRIDO), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_barrido(ruta_salida, cache):
+    archivo = os.path.join(ruta_salida, ARCHIVO_BARRIDO)
+    temporal = archivo + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temporal, archivo)
+
+
+def barrido_k(X, pesos, ks=range(1, 11), variables=VARIABLES_MODELO, ruta_salida='data/procesados',
+              procesos=None, minibatch=None, semilla=42):
+    """Inercia y silueta para cada K, en paralelo y con caché por (variables, datos, K)
+
+    `X` son las variables sin escalar; se estandarizan como en el notebook. Devuelve
+    una lista de ``{'k', 'inercia', 'inercia_ponderada', 'silueta'}`` ordenada por K.
+    """
+    X = StandardScaler().fit_transform(X)
+    if minibatch is None:
+        minibatch = len(X) >= UMBRAL_MINIBATCH
+    huella = huella_datos(X, pesos)
+    conjunto = ','.join(variables)
+    cache = leer_barrido(ruta_salida)
+
+    def llave(k):
+        return f'{conjunto}|{huella}|{k}|{"minibatch" if minibatch else "kmeans"}|v{VERSION_BARRIDO}'
+
+    pendientes = [k for k in ks if llave(k) not in cache]
+    if pendientes:
+        procesos = procesos or min(len(pendientes), os.cpu_count() or 1)
+        if procesos == 1:
+            for k in pendientes:
+                cache[llave(k)] = ajustar_k(X, pesos, k, minibatch, semilla)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                futuros = {
+                    k: ejecutor.submit(ajustar_k, X, pesos, k, minibatch, semilla)
+                    for k in pendientes
+                }
+                for k, futuro in futuros.items():
+                    cache[llave(k)] = futuro.result()
+        guardar_barrido(ruta_salida, cache)
+
+    return [{c: cache[llave(k)][c] for c in ('k', 'inercia', 'inercia_ponderada', 'silueta')} for k in ks]
+
+
+# --- 4. ENTRENAMIENTO PONDERADO ---
+
+def bloques_hogares(años, ruta_salida='data/procesados', grupo='extrema', variables=VARIABLES_MODELO,
+                    tamaño_bloque=TAMAÑO_BLOQUE):
+    """Genera ``(año, X, factor)`` por bloques de los parquet enriquecidos, sin cargar ningún año completo
+
+    Solo quedan los hogares del grupo con todas las variables y el factor.
+    """
+    columnas = sorted({*(v for v in variables if v != 'tiene_celular'), 'celular', 'pobreza', 'pobreza_e', 'factor'})
+    for año in años:
+        archivo = pq.ParquetFile(os.path.join(ruta_salida, f'enigh_{año}_final_enriquecido.parquet'))
+        for lote in archivo.iter_batches(batch_size=tamaño_bloque, columns=columnas):
+            df = lote.to_pandas()
+            df = df[GRUPOS_SEGMENTACION[grupo](df).to_numpy()]
+            X = matriz_variables(df, variables).to_numpy(dtype='float64', na_value=np.nan)
+            pesos = df['factor'].to_numpy(dtype='float64', na_value=np.nan)
+            completos = ~np.isnan(X).any(axis=1) & ~np.isnan(pesos)
+            yield año, X[completos], pesos[completos]
+
+
+def entrenar_por_bloques(años, ruta_salida='data/procesados', grupo='extrema', k=5, variables=VARIABLES_MODELO,
+                         tamaño_bloque=TAMAÑO_BLOQUE, epocas=EPOCAS, semilla=42):
+    """K-Means ponderado que recorre los años por bloques (``MiniBatchKMeans.partial_fit``)
+
+    Una primera pasada acumula las medias y varianzas ponderadas y guarda una muestra
+    para inicializar los centroides; después cada época recorre todos los bloques y
+    una última pasada asigna los hogares para medir el tamaño ponderado de cada
+    perfil por año. Devuelve ``(modelo, perfiles)``.
+    """
+    rng = np.random.default_rng(semilla)
+    suma_pesos, suma, suma_cuadrados = 0.0, 0.0, 0.0
+    muestra, pesos_muestra = [], []
+    for _, X, pesos in bloques_hogares(años, ruta_salida, grupo, variables, tamaño_bloque):
+        suma_pesos += pesos.sum()
+        suma = suma + pesos @ X
+        suma_cuadrados = suma_cuadrados + pesos @ (X ** 2)
+        elegidos = rng.choice(len(X), min(len(X), MUESTRA_POR_BLOQUE), replace=False)
+        muestra.append(X[elegidos])
+        pesos_muestra.append(pesos[elegidos])
+    if not suma_pesos:
+        raise ValueError(f"No hay hogares del grupo '{grupo}' en los años {list(años)}")
+
+    medias = suma / suma_pesos
+    escalas = np.sqrt(np.maximum(suma_cuadrados / suma_pesos - medias ** 2, 0))
+    escalas[escalas == 0] = 1.0
+
+    def escalar(X):
+        return (X - medias) / escalas
+
+    inicial = KMeans(n_clusters=k, n_init=10, random_state=semilla).fit(
+        escalar(np.concatenate(muestra)), sample_weight=np.concatenate(pesos_muestra)
+    )
+    kmeans = MiniBatchKMeans(n_clusters=k, init=inicial.cluster_centers_, n_init=1, random_state=semilla)
+    for _ in range(epocas):
+        for _, X, pesos in bloques_hogares(años, ruta_salida, grupo, variables, tamaño_bloque):
+            if len(X):
+                kmeans.partial_fit(escalar(X), sample_weight=pesos)
+
+    modelo = ModeloPerfiles(medias, escalas, kmeans.cluster_centers_, variables)
+    if grupo == 'extrema':
+        # Solo la pobreza extrema es comparable con el modelo de 2024 y sus nombres
+        modelo = alinear_con_referencia(modelo)
+
+    hogares = {}
+    for año, X, pesos in bloques_hogares(años, ruta_salida, grupo, variables, tamaño_bloque):
+        hogares[año] = hogares.get(año, 0) + np.bincount(modelo.predecir(X), weights=pesos, minlength=k)
+    perfiles = []
+    for año, por_cluster in hogares.items():
+        porcentaje = por_cluster / por_cluster.sum() * 100
+        perfiles += [{'Año': año, 'Perfil': nombre_perfil(c, grupo),
+                      'Porcentaje': round(float(porcentaje[c]), 2), 'Hogares': int(round(por_cluster[c]))}
+                     for c in range(k)]
+    return modelo, perfiles
+
+
+def nombre_perfil(cluster, grupo):
+    """Nombre del perfil: los del modelo de 2024 para pobreza extrema, 'Perfil n' en otro caso"""
+    if grupo == 'extrema' and cluster in PERFILES_POBREZA:
+        return PERFILES_POBREZA[cluster]
+    return f'Perfil {cluster + 1}'
+
+
+def alinear_con_referencia(modelo, referencia=None):
+    """Reordena los clusters para que el i-ésimo sea el más parecido al perfil i del modelo de 2024
+
+    Así los nombres de ``PERFILES_POBREZA`` siguen valiendo. Sin modelo de referencia,
+    o con otro K u otras variables, el modelo se devuelve tal cual.
+    """
+    referencia = referencia or cargar_modelo()
+    if (referencia is None or len(referencia.centroides) != len(modelo.centroides)
+            or referencia.variables != modelo.variables):
+        return modelo
+    originales = modelo.centroides * modelo.escalas + modelo.medias
+    en_referencia = (originales - referencia.medias) / referencia.escalas
+    costo = ((en_referencia[:, None, :] - referencia.centroides[None, :, :]) ** 2).sum(axis=2)
+    filas, columnas = linear_sum_assignment(costo)
+    return ModeloPerfiles(modelo.medias, modelo.escalas, modelo.centroides[filas[np.argsort(columnas)]],
+                          modelo.variables)
+
+
+def guardar_segmentacion(modelo, perfiles, grupo, ruta_salida='data/procesados'):
+    """Guarda el modelo (``segmentacion_{grupo}.npz``) y los tamaños por año en ``segmentacion_{grupo}.json``"""
+    ruta_modelo = modelo.guardar(os.path.join(ruta_salida, f'segmentacion_{grupo}.npz'))
+    archivo = os.path.join(ruta_salida, ARCHIVO_SEGMENTACION.format(grupo=grupo))
+    temporal = archivo + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'grupo': grupo, 'k': len(modelo.centroides), 'modelo': os.path.basename(ruta_modelo),
+                   'perfiles': perfiles}, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, archivo)
+    return ruta_modelo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m enigh.segmentacion', description=__doc__.splitlines()[0])
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    barrido = comandos.add_parser('barrido', help='Método del codo y silueta para un rango de K')
+    barrido.add_argument('--años', type=int, nargs='+', default=[2024])
+    barrido.add_argument('--k', type=int, nargs=2, default=[1, 10], metavar=('MIN', 'MAX'))
+    barrido.add_argument('--salida', default='data/procesados')
+    barrido.add_argument('--procesos', type=int, default=None)
+    barrido.add_argument('--minibatch', action='store_true', default=None,
+                         help=f'Usa MiniBatchKMeans (por defecto solo con {UMBRAL_MINIBATCH:,} hogares o más)')
+
+    entrenar = comandos.add_parser('entrenar', help='K-Means ponderado por el factor, por bloques, sobre varios años')
+    entrenar.add_argument('--años', type=int, nargs='+', default=[2018, 2020, 2022, 2024])
+    entrenar.add_argument('--grupo', choices=sorted(GRUPOS_SEGMENTACION), default='extrema')
+    entrenar.add_argument('--k', type=int, default=5)
+    entrenar.add_argument('--salida', default='data/procesados')
+    entrenar.add_argument('--epocas', type=int, default=EPOCAS)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'entrenar':
+        modelo, perfiles = entrenar_por_bloques(args.años, args.salida, args.grupo, args.k, epocas=args.epocas)
+        print(f"Modelo en {guardar_segmentacion(modelo, perfiles, args.grupo, args.salida)}")
+        for fila in perfiles:
+            print(f"{fila['Año']}  {fila['Perfil']:<40}{fila['Porcentaje']:>7.2f}%{fila['Hogares']:>12,}")
+        # Los tamaños entrenados pasan a las series de la página 03
+        print(f"Agregados de las páginas en {construir_agregados(args.salida)}")
+        return
+
+    X, pesos = datos_segmentacion(args.años, args.salida)
+    resultados = barrido_k(X, pesos, range(args.k[0], args.k[1] + 1), ruta_salida=args.salida,
+                           procesos=args.procesos, minibatch=args.minibatch)
+    print(f"{len(X):,} hogares en pobreza extrema ({', '.join(map(str, args.años))})")
+    print(f"{'K':>3}{'Inercia':>14}{'Inercia ponderada':>20}{'Silueta':>10}")
+    for r in resultados:
+        print(f"{r['k']:>3}{r['inercia']:>14,.0f}{r['inercia_ponderada']:>20,.4g}{r['silueta']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Errores estándar de diseño para las métricas ponderadas (bootstrap por UPM).
+
+La ENIGH es una muestra estratificada (``est_dis``) y por conglomerados (``upm``),
+así que la variabilidad de una estimación depende de cuántas UPM la sostienen y
+no solo del número de hogares. Se usa el bootstrap reescalado de Rao-Wu: en cada
+estrato con n UPM se eligen n - 1 con reemplazo y cada UPM recibe el
+multiplicador ``n / (n - 1) · veces elegida``. Los multiplicadores se guardan por
+UPM, no por hogar, en una matriz UPM × réplicas que se genera una vez por
+conjunto de datos cargado.
+
+Una métrica sobre una selección de hogares se reduce a sumar Σpeso y Σpeso·x por
+UPM (y grupo) con ``bincount`` y multiplicar esas sumas por la matriz de
+multiplicadores: todas las réplicas de todas las métricas y grupos salen de un
+solo producto de matrices. El error estándar es la desviación cuadrática media de
+las réplicas alrededor de la estimación.
+"""
+import numpy as np
+import pandas as pd
+
+from enigh.ponderados import MEDIA, PROPORCION, TOTAL
+
+REPLICAS = 100
+
+# Cuantil normal para intervalos al 95%
+Z_95 = 1.959964
+
+
+class ReplicasBootstrap:
+    """Multiplicadores bootstrap (Rao-Wu) por UPM de un conjunto de hogares"""
+
+    def __init__(self, df, replicas=REPLICAS, estrato='est_dis', upm='upm', periodo='Año', semilla=2024):
+        # Las claves de UPM y estrato se reinician en cada levantamiento: se combinan con el año
+        año = df[periodo].to_numpy(dtype='int64') if periodo in df.columns else np.zeros(len(df), dtype='int64')
+        self.codigos, claves = pd.factorize(año * 10**10 + df[upm].to_numpy(dtype='int64'), sort=True)
+        self.codigos = self.codigos.astype('int32')
+        self.n_upm = len(claves)
+        self.replicas = replicas
+
+        estratos = np.empty(self.n_upm, dtype='int64')
+        estratos[self.codigos] = df[estrato].to_numpy(dtype='int64')
+        años_upm = claves // 10**10
+
+        self.multiplicadores = np.ones((self.n_upm, replicas))
+        for año_upm in np.unique(años_upm):
+            # Una semilla por año: los multiplicadores de un año no cambian al combinarlo con otros
+            rng = np.random.default_rng([semilla, int(año_upm)])
+            del_año = np.flatnonzero(años_upm == año_upm)
+            for h in np.unique(estratos[del_año]):
+                miembros = del_año[estratos[del_año] == h]
+                n = len(miembros)
+                if n < 2:
+                    continue  # estrato con una sola UPM: no aporta varianza
+                elegidos = rng.integers(0, n, size=(n - 1, replicas))
+                conteos = np.zeros((n, replicas))
+                np.add.at(conteos, (elegidos, np.arange(replicas)), 1)
+                self.multiplicadores[miembros] = conteos * (n / (n - 1))
+
+    @property
+    def nbytes(self):
+        return self.multiplicadores.nbytes + self.codigos.nbytes
+
+    def errores(self, df, posiciones, metricas, peso='factor', por=None):
+        """Estimación y error estándar de cada métrica sobre los hogares en `posiciones`
+
+        `metricas` tiene el formato de ``metricas_desde_sumas``. Devuelve un DataFrame
+        (una fila, o una por valor de `por`) con la columna ``{nombre}`` y su error
+        estándar ``{nombre}_ee`` para cada métrica.
+        """
+        columnas = sorted({col for _, col in metricas.values() if col != peso})
+        pesos = df[peso].to_numpy(dtype='float64')[posiciones]
+        upm = self.codigos[posiciones].astype('int64')
+
+        if por:
+            grupos, valores = pd.factorize(df[por].to_numpy()[posiciones], sort=True)
+            n_grupos = len(valores)
+            celdas = upm * n_grupos + grupos
+            validos = grupos >= 0
+            celdas, pesos_validos = celdas[validos], pesos[validos]
+        else:
+            valores, n_grupos = None, 1
+            celdas, pesos_validos, validos = upm, pesos, slice(None)
+
+        # Σpeso y Σpeso·x por (UPM, grupo): matriz UPM × (grupos · variables)
+        tamaño = self.n_upm * n_grupos
+        sumas = [np.bincount(celdas, weights=pesos_validos, minlength=tamaño)]
+        for col in columnas:
+            x = df[col].to_numpy(dtype='float64', na_value=np.nan)[posiciones][validos]
+            sumas.append(np.bincount(celdas, weights=np.nan_to_num(x * pesos_validos), minlength=tamaño))
+        S = np.stack(sumas, axis=1).reshape(self.n_upm, n_grupos * len(sumas))
+
+        # Estimación con los pesos originales y todas las réplicas en un solo producto
+        estimado = S.sum(axis=0).reshape(n_grupos, len(sumas))
+        replicado = (self.multiplicadores.T @ S).reshape(self.replicas, n_grupos, len(sumas))
+
+        indice = {col: i + 1 for i, col in enumerate(columnas)}
+        resultado = pd.DataFrame({por: valores}) if por else pd.DataFrame(index=[0])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for nombre, (tipo, col) in metricas.items():
+                if tipo == TOTAL:
+                    j = 0 if col == peso else indice[col]
+                    theta, theta_r = estimado[:, j], replicado[:, :, j]
+                elif tipo in (MEDIA, PROPORCION):
+                    escala = 100 if tipo == PROPORCION else 1
+                    theta = estimado[:, indice[col]] / estimado[:, 0] * escala
+                    theta_r = replicado[:, :, indice[col]] / replicado[:, :, 0] * escala
+                else:
+                    raise ValueError(f"Tipo de métrica desconocido: {tipo}")
+                # Réplicas sin hogares del grupo (dominios muy pequeños) no cuentan
+                desvios = (theta_r - theta) ** 2
+                validas = np.count_nonzero(~np.isnan(desvios), axis=0)
+                resultado[nombre] = theta
+                resultado[f'{nombre}_ee'] = np.sqrt(np.nansum(desvios, axis=0) / validas)
+        return resultado
+
+
+def intervalo(estimado, error, z=Z_95):
+    """Límites (inferior, superior) del intervalo de confianza"""
+    return estimado - z * error, estimado + z * error
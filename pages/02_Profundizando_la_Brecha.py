@@ -5,48 +5,86 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from enigh.agregados import leer_agregados, tabla
+
 st.set_page_config(page_title="Análisis de Calidad y Gasto", page_icon="📈", layout="wide")
 
+# Series calculadas por el pipeline (python -m enigh.etl); sin ellas se usan las cifras del estudio
+agregados = leer_agregados()
+
 # --- Título y contexto ---
 st.title('📊 Más Allá del Acceso: Calidad y Esfuerzo Económico')
 st.markdown("""
 **El verdadero desafío digital no está solo en tener un dispositivo, sino en la calidad de la conexión y el esfuerzo económico que representa mantenerla.**
 """)
 
-# --- MÉTRICAS CLAVE (CON DATOS FINALES DIRECTOS) ---
+# --- DATOS AGREGADOS ---
+# Calidad de conexión en pobreza extrema (formato largo para el gráfico de áreas)
+data_calidad = {
+    'Año': [2018, 2020, 2022, 2024] * 3,
+    'categoria_conexion': ['1. Sin Celular']*4 + ['2. Con Celular, Sin Internet']*4 + ['3. Con Celular y Con Internet']*4,
+    'Porcentaje': [40.30, 24.03, 20.09, 17.11, 56.46, 60.62, 61.09, 55.76, 3.24, 15.35, 18.82, 27.13]
+}
+df_calidad = pd.DataFrame(data_calidad)
+if agregados and agregados.get('calidad'):
+    df_calidad = tabla(agregados, 'calidad', None).melt(
+        id_vars='Año', var_name='categoria_conexion', value_name='Porcentaje'
+    ).replace({'categoria_conexion': {
+        'Sin_Celular': '1. Sin Celular',
+        'Solo_Celular': '2. Con Celular, Sin Internet',
+        'Con_Celular_e_Internet': '3. Con Celular y Con Internet'
+    }})
+
+# % del ingreso destinado al celular por condición de pobreza
+data_gasto = {
+    'Año': [2018, 2020, 2022, 2024] * 3,
+    'Grupo': ['No Pobre']*4 + ['Pobreza Moderada']*4 + ['Pobreza Extrema']*4,
+    'pct_gasto_promedio': [1.45, 1.90, 1.55, 1.48, 1.89, 2.79, 2.23, 2.31, 2.02, 3.64, 2.85, 2.86]
+}
+df_gasto = tabla(agregados, 'gasto', pd.DataFrame(data_gasto))
+
+def serie(df, columna, valor, filtro):
+    """Valores de `valor` por año para las filas donde `columna == filtro`"""
+    return df[df[columna] == filtro].set_index('Año')[valor].sort_index()
+
+internet = serie(df_calidad, 'categoria_conexion', 'Porcentaje', '3. Con Celular y Con Internet')
+gasto_extrema = serie(df_gasto, 'Grupo', 'pct_gasto_promedio', 'Pobreza Extrema')
+año_inicial, año_final = int(internet.index[0]), int(internet.index[-1])
+
+# --- MÉTRICAS CLAVE ---
 st.header('📈 Indicadores Clave de Transformación en Pobreza Extrema', divider='blue')
 
-# Usamos los valores finales que ya calculamos, sin cargar los archivos pesados
-pct_internet_2024 = 27.1
-pct_internet_2018 = 3.2
-gasto_2024 = 2.86
-gasto_2018 = 2.02
-pct_solo_cel_2024 = 55.76
-pct_sin_cel_2024 = 17.11
+pct_internet_final = internet.iloc[-1]
+pct_internet_inicial = internet.iloc[0]
+gasto_final = gasto_extrema.iloc[-1]
+gasto_inicial = gasto_extrema.iloc[0]
+pct_solo_cel_final = serie(df_calidad, 'categoria_conexion', 'Porcentaje', '2. Con Celular, Sin Internet').iloc[-1]
+sin_celular = serie(df_calidad, 'categoria_conexion', 'Porcentaje', '1. Sin Celular')
+pct_sin_cel_inicial, pct_sin_cel_final = sin_celular.iloc[0], sin_celular.iloc[-1]
 
 col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         "Acceso a Internet en Casa", 
-        f"{pct_internet_2024:.1f}%",
-        f"+{pct_internet_2024 - pct_internet_2018:.1f} pp vs 2018"
+        f"{pct_internet_final:.1f}%",
+        f"{pct_internet_final - pct_internet_inicial:+.1f} pp vs {año_inicial}"
     )
 with col2:
     st.metric(
         "Gasto Promedio (% Ingreso)", 
-        f"{gasto_2024:.2f}%",
-        f"+{gasto_2024 - gasto_2018:.2f} pp vs 2018"
+        f"{gasto_final:.2f}%",
+        f"{gasto_final - gasto_inicial:+.2f} pp vs {año_inicial}"
     )
 with col3:
     st.metric(
         "Solo Celular (Sin Internet)", 
-        f"{pct_solo_cel_2024:.1f}%",
+        f"{pct_solo_cel_final:.1f}%",
         "Brecha de calidad persistente"
     )
 with col4:
     st.metric(
         "Hogares Sin Celular", 
-        f"{pct_sin_cel_2024:.1f}%",
+        f"{pct_sin_cel_final:.1f}%",
         "Reducción exitosa del aislamiento"
     )
 
@@ -57,14 +95,6 @@ st.header('🌐 La Brecha Persistente: Calidad de la Conexión', divider='blue')
 
 col1, col2 = st.columns([2, 1])
 with col1:
-    # Crear el DataFrame para el gráfico de calidad directamente
-    data_calidad = {
-        'Año': [2018, 2020, 2022, 2024] * 3,
-        'categoria_conexion': ['1. Sin Celular']*4 + ['2. Con Celular, Sin Internet']*4 + ['3. Con Celular y Con Internet']*4,
-        'Porcentaje': [40.30, 24.03, 20.09, 17.11, 56.46, 60.62, 61.09, 55.76, 3.24, 15.35, 18.82, 27.13]
-    }
-    df_calidad = pd.DataFrame(data_calidad)
-    
     fig_calidad = px.area(
         df_calidad, x='Año', y='Porcentaje', color='categoria_conexion',
         title='Evolución del Acceso Tecnológico en Hogares de Pobreza Extrema',
@@ -79,15 +109,15 @@ with col1:
     st.plotly_chart(fig_calidad, use_container_width=True)
 
 with col2:
-    st.markdown("""
+    st.markdown(f"""
     ### 🔍 Insights Clave
     
     **✅ Progreso Notable:**
-    - Los hogares sin celular (**rojo**) se redujeron a menos de la mitad.
-    - El acceso con internet en casa (**verde**) creció 8 veces.
+    - Los hogares sin celular (**rojo**) pasaron de {pct_sin_cel_inicial:.1f}% a {pct_sin_cel_final:.1f}%.
+    - El acceso con internet en casa (**verde**) creció {pct_internet_final / pct_internet_inicial:.0f} veces.
     
     **⚠️ Desafío Persistente:**
-    - Más de la mitad de los hogares (**naranja**) aún depende de una conexión limitada solo por celular.
+    - El {pct_solo_cel_final:.0f}% de los hogares (**naranja**) aún depende de una conexión limitada solo por celular.
     
     **🎯 Oportunidad:**
     - Focalizar políticas públicas en subsidios o infraestructura para mejorar la conectividad domiciliaria.
@@ -96,14 +126,6 @@ with col2:
 # --- Análisis de Gasto ---
 st.header('💰 El Esfuerzo Económico para Mantenerse Conectado', divider='green')
 
-# Crear el DataFrame para el gráfico de gasto directamente
-data_gasto = {
-    'Año': [2018, 2020, 2022, 2024] * 3,
-    'Grupo': ['No Pobre']*4 + ['Pobreza Moderada']*4 + ['Pobreza Extrema']*4,
-    'pct_gasto_promedio': [1.45, 1.90, 1.55, 1.48, 1.89, 2.79, 2.23, 2.31, 2.02, 3.64, 2.85, 2.86]
-}
-df_gasto = pd.DataFrame(data_gasto)
-
 # Usaremos Plotly Graph Objects para un diseño más avanzado
 fig_gasto = go.Figure()
 colores_pobreza = {'Pobreza Extrema': '#d32f2f', 'Pobreza Moderada': '#ff9800', 'No Pobre': '#388e3c'}
@@ -5,11 +5,14 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 
+from enigh.agregados import fecha_agregados, leer_agregados, tabla
+
 st.set_page_config(page_title="Segmentación de Hogares", page_icon="🎭", layout="wide")
 
 # --- Función de Carga de Datos ---
 @st.cache_data
-def cargar_datos_comparacion():
+def cargar_datos_comparacion(fecha):
+    """Distribución de perfiles por año; `fecha` (de agregados.json) renueva la caché al regenerarlos"""
     data = {
         'Perfil': [
             "Aislamiento Rural Profundo", "Conectividad Precaria en el Campo",
@@ -24,6 +27,17 @@ def cargar_datos_comparacion():
         'Prioridad_Política': ['Crítica', 'Media', 'Media', 'Baja', 'Media']
     }
     df_comparacion = pd.DataFrame(data)
+    
+    # Las distribuciones calculadas desde los datos (entrenamiento ponderado o clusters del
+    # pipeline) reemplazan las cifras de los años que tengan
+    perfiles = tabla(leer_agregados(), 'perfiles', None)
+    if perfiles is not None:
+        for año in ['2018', '2024']:
+            porcentajes = perfiles[perfiles['Año'] == int(año)].set_index('Perfil')['Porcentaje']
+            if not porcentajes.empty:
+                df_comparacion[año] = df_comparacion['Perfil'].map(porcentajes).fillna(0)
+        df_comparacion['Cambio'] = df_comparacion['2024'] - df_comparacion['2018']
+    
     return df_comparacion
 
 # --- Título y Contexto ---
@@ -34,7 +48,10 @@ La realidad de 2024 muestra una reconfiguración dramática: la pobreza ya no es
 """)
 
 # --- Cargar Datos ---
-df_comp = cargar_datos_comparacion()
+df_comp = cargar_datos_comparacion(fecha_agregados())
+tamaño = df_comp.set_index('Perfil')['2024']
+cambio = df_comp.set_index('Perfil')['Cambio']
+conectados = df_comp[df_comp['Conectividad'] != 'Nula'][['2018', '2024']].sum()
 
 # --- INDICADORES CLAVE DE TRANSFORMACIÓN ---
 st.header('📊 La Gran Reconfiguración en Números')
@@ -44,32 +61,32 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         "Hogares Digitalmente Conectados", 
-        "82.6%", 
-        "+65.8 pp vs 2018",
+        f"{conectados['2024']:.1f}%", 
+        f"{conectados['2024'] - conectados['2018']:+.1f} pp vs 2018",
         help="Suma de perfiles con conectividad Alta o Media"
     )
 
 with col2:
     st.metric(
         "Mayor Grupo: Urbano Informal", 
-        "34.2%",
-        "+17.8 pp",
+        f"{tamaño['Pobreza Urbana Informal y Conectada']:.1f}%",
+        f"{cambio['Pobreza Urbana Informal y Conectada']:+.1f} pp",
         help="El perfil que más creció"
     )
 
 with col3:
     st.metric(
         "Aislamiento Profundo", 
-        "14.4%",
-        "-24.0 pp",
+        f"{tamaño['Aislamiento Rural Profundo']:.1f}%",
+        f"{cambio['Aislamiento Rural Profundo']:+.1f} pp",
         help="Reducción del grupo más vulnerable"
     )
 
 with col4:
     st.metric(
         "Nuevos Rurales Conectados", 
-        "31.7%",
-        "+26.8 pp",
+        f"{tamaño['Conectividad Precaria en el Campo']:.1f}%",
+        f"{cambio['Conectividad Precaria en el Campo']:+.1f} pp",
         help="Emergen rurales con celular pero sin servicios"
     )
 
@@ -155,8 +172,8 @@ perfiles_detalle = {
         "🟣 Formales pero Vulnerables",
         "🟡 Conectados con Acceso a Salud"
     ],
-    'Tamaño_2024': [14.4, 31.7, 34.2, 3.0, 16.7],
-    'Cambio': [-24.0, +26.8, +17.8, +0.7, -21.3],
+    'Tamaño_2024': tamaño.round(1).tolist(),
+    'Cambio': cambio.round(1).tolist(),
     'Conectividad_Digital': ["❌ Nula", "✅ Total", "✅ Total", "🟡 Media", "✅ Total"],
     'Principal_Carencia': ["Todo", "Salud/Seg.Social", "Seg.Social", "Ingresos", "Vivienda"],
     'Estrategia_Sugerida': ["Presencial", "Telemedicina", "Emp. Digital", "Mejora Salarial", "Infraestructura"],
@@ -188,11 +205,11 @@ st.header('👥 Conoce a cada Perfil: Historias detrás de los Números', divide
 
 # Crear tabs para cada perfil
 tabs = st.tabs([
-    "🔵 Urbano Informal (34.2%)",
-    "🟢 Rural Conectado (31.7%)", 
-    "🟡 Con Salud (16.7%)",
-    "🔴 Aislamiento Rural (14.4%)",
-    "🟣 Formales (3.0%)"
+    f"🔵 Urbano Informal ({tamaño['Pobreza Urbana Informal y Conectada']:.1f}%)",
+    f"🟢 Rural Conectado ({tamaño['Conectividad Precaria en el Campo']:.1f}%)", 
+    f"🟡 Con Salud ({tamaño['Conectados con Acceso a Salud']:.1f}%)",
+    f"🔴 Aislamiento Rural ({tamaño['Aislamiento Rural Profundo']:.1f}%)",
+    f"🟣 Formales ({tamaño['Formales pero Vulnerables']:.1f}%)"
 ])
 
 with tabs[0]:
@@ -223,7 +240,7 @@ with tabs[0]:
         # Mini gráfico del perfil
         fig_perfil1 = go.Figure(go.Indicator(
             mode = "gauge+number",
-            value = 34.2,
+            value = round(tamaño['Pobreza Urbana Informal y Conectada'], 1),
             title = {'text': "% del Total<br>Pobreza Extrema"},
             gauge = {
                 'axis': {'range': [None, 40]},
@@ -235,7 +252,7 @@ with tabs[0]:
         fig_perfil1.update_layout(height=250)
         st.plotly_chart(fig_perfil1, use_container_width=True)
         
-        st.metric("Cambio vs 2018", "+17.8 pp", "💹 Mayor crecimiento")
+        st.metric("Cambio vs 2018", f"{cambio['Pobreza Urbana Informal y Conectada']:+.1f} pp", "💹 Mayor crecimiento")
 
 with tabs[1]:
     col1, col2 = st.columns([2, 1])
@@ -264,7 +281,7 @@ with tabs[1]:
     with col2:
         fig_perfil2 = go.Figure(go.Indicator(
             mode = "gauge+number",
-            value = 31.7,
+            value = round(tamaño['Conectividad Precaria en el Campo'], 1),
             title = {'text': "% del Total<br>Pobreza Extrema"},
             gauge = {
                 'axis': {'range': [None, 40]},
@@ -276,7 +293,7 @@ with tabs[1]:
         fig_perfil2.update_layout(height=250)
         st.plotly_chart(fig_perfil2, use_container_width=True)
         
-        st.metric("Cambio vs 2018", "+26.8 pp", "🚀 Explosión digital rural")
+        st.metric("Cambio vs 2018", f"{cambio['Conectividad Precaria en el Campo']:+.1f} pp", "🚀 Explosión digital rural")
 
 with tabs[2]:
     col1, col2 = st.columns([2, 1])
@@ -304,7 +321,7 @@ with tabs[2]:
     with col2:
         fig_perfil3 = go.Figure(go.Indicator(
             mode = "gauge+number",
-            value = 16.7,
+            value = round(tamaño['Conectados con Acceso a Salud'], 1),
             title = {'text': "% del Total<br>Pobreza Extrema"},
             gauge = {
                 'axis': {'range': [None, 40]},
@@ -316,7 +333,7 @@ with tabs[2]:
         fig_perfil3.update_layout(height=250)
         st.plotly_chart(fig_perfil3, use_container_width=True)
         
-        st.metric("Cambio vs 2018", "-21.3 pp", "📉 Grupo en transición")
+        st.metric("Cambio vs 2018", f"{cambio['Conectados con Acceso a Salud']:+.1f} pp", "📉 Grupo en transición")
 
 with tabs[3]:
     col1, col2 = st.columns([2, 1])
@@ -344,7 +361,7 @@ with tabs[3]:
     with col2:
         fig_perfil4 = go.Figure(go.Indicator(
             mode = "gauge+number",
-            value = 14.4,
+            value = round(tamaño['Aislamiento Rural Profundo'], 1),
             title = {'text': "% del Total<br>Pobreza Extrema"},
             gauge = {
                 'axis': {'range': [None, 40]},
@@ -356,7 +373,7 @@ with tabs[3]:
         fig_perfil4.update_layout(height=250)
         st.plotly_chart(fig_perfil4, use_container_width=True)
         
-        st.metric("Cambio vs 2018", "-24.0 pp", "✅ Reducción exitosa")
+        st.metric("Cambio vs 2018", f"{cambio['Aislamiento Rural Profundo']:+.1f} pp", "✅ Reducción exitosa")
 
 with tabs[4]:
     col1, col2 = st.columns([2, 1])
@@ -385,7 +402,7 @@ with tabs[4]:
     with col2:
         fig_perfil5 = go.Figure(go.Indicator(
             mode = "gauge+number",
-            value = 3.0,
+            value = round(tamaño['Formales pero Vulnerables'], 1),
             title = {'text': "% del Total<br>Pobreza Extrema"},
             gauge = {
                 'axis': {'range': [None, 40]},
@@ -397,7 +414,7 @@ with tabs[4]:
         fig_perfil5.update_layout(height=250)
         st.plotly_chart(fig_perfil5, use_container_width=True)
         
-        st.metric("Cambio vs 2018", "+0.7 pp", "📊 Grupo estable")
+        st.metric("Cambio vs 2018", f"{cambio['Formales pero Vulnerables']:+.1f} pp", "📊 Grupo estable")
 
 # --- SÍNTESIS FINAL ---
 st.header('🎯 Síntesis: Una Nueva Era de Políticas Públicas Diferenciadas', divider='rainbow')
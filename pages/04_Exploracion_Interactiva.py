@@ -5,6 +5,26 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+from functools import partial
+import pyarrow as pa
+
+from enigh.almacen import AlmacenCompartido
+from enigh.carga import (
+    compactar_tipos, derivar_columnas, filtros_pushdown, filtros_servicio,
+    leer_enriquecido, leer_servicio, leer_servicio_mapeado, ruta_servicio, ruta_servicio_arrow
+)
+from enigh.catalogos import CONDICIONES_POBREZA, ENTIDADES_MEXICO, NOMBRES_CARENCIAS, PERFILES_POBREZA
+from enigh.cuantiles import IndiceOrdenado, codigos_cuantiles, sumas_por_cuantil
+from enigh.cubo import DIMENSIONES, construir_cubo
+from enigh.exportacion import FORMATOS, CacheExportaciones, exportar
+from enigh.filtros import IndiceBitmap, mascara
+from enigh.geografia import leer_geometria
+from enigh.paginacion import TAMAÑOS_PAGINA, OrdenColumna, coincidencias, pagina, total_paginas
+from enigh.grafo import Grafo, congelar
+from enigh.histogramas import HistogramasPorCelda, agrupar_intervalos, bordes_finos
+from enigh.perfiles import asignar_clusters, cargar_modelo
+from enigh.ponderados import MEDIA, PROPORCION, TOTAL, metricas_desde_sumas
+from enigh.varianza import REPLICAS, Z_95, ReplicasBootstrap, intervalo
 
 # --- 1. CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(
@@ -13,27 +33,48 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- Diccionario de Entidades Federativas ---
-ENTIDADES_MEXICO = {
-    1: "Aguascalientes", 2: "Baja California", 3: "Baja California Sur", 4: "Campeche", 5: "Coahuila de Zaragoza",
-    6: "Colima", 7: "Chiapas", 8: "Chihuahua", 9: "Ciudad de México", 10: "Durango", 11: "Guanajuato",
-    12: "Guerrero", 13: "Hidalgo", 14: "Jalisco", 15: "México", 16: "Michoacán de Ocampo", 17: "Morelos",
-    18: "Nayarit", 19: "Nuevo León", 20: "Oaxaca", 21: "Puebla", 22: "Querétaro", 23: "Quintana Roo",
-    24: "San Luis Potosí", 25: "Sinaloa", 26: "Sonora", 27: "Tabasco", 28: "Tamaulipas", 29: "Tlaxcala",
-    30: "Veracruz de Ignacio de la Llave", 31: "Yucatán", 32: "Zacatecas"
+# Métricas ponderadas que se piden al motor de agregación
+METRICAS_SELECCION = {
+    'Hogares': (TOTAL, 'factor'),
+    'Acceso_Celular': (PROPORCION, 'tiene_celular'),
+    'Acceso_Internet': (PROPORCION, 'tiene_internet'),
+    'Conexion_Completa': (PROPORCION, 'conexion_completa'),
+    'Ingreso_Promedio': (MEDIA, 'ictpc'),
+    'Gasto_Celular_Pct': (MEDIA, 'pct_gasto_celular'),
+    **{carencia: (PROPORCION, carencia) for carencia in NOMBRES_CARENCIAS}
 }
 
-NOMBRES_CARENCIAS = {
-    'ic_rezedu': 'Rezago Educativo',
-    'ic_asalud': 'Acceso a Salud', 
-    'ic_segsoc': 'Seguridad Social',
-    'ic_cv': 'Calidad de Vivienda',
-    'ic_sbv': 'Servicios Básicos',
-    'ic_ali': 'Alimentación'
+# Indicadores que se pueden ver en el mapa de entidades, con su etiqueta
+INDICADORES_MAPA = {
+    'Acceso_Celular': 'Acceso a Celular (%)',
+    'Acceso_Internet': 'Acceso a Internet (%)',
+    'Conexion_Completa': 'Conexión Completa (%)',
+    'Ingreso_Promedio': 'Ingreso Per Cápita (MXN)',
+    'Gasto_Celular_Pct': 'Gasto en Celular (% del ingreso)',
+    'Hogares': 'Hogares (expandido)',
+    **{carencia: f'Carencia: {nombre} (%)' for carencia, nombre in NOMBRES_CARENCIAS.items()}
 }
 
+# Memoria máxima para años cargados, compartida por todas las sesiones
+CACHE_MAX_MB = float(os.environ.get('ENIGH_CACHE_MAX_MB', 1024))
+
 # --- 2. FUNCIONES DE CARGA OPTIMIZADA (BAJO DEMANDA) ---
 
+@st.cache_resource
+def almacen_años():
+    """Almacén de tablas Arrow por año (LRU por bytes), único para todo el proceso"""
+    return AlmacenCompartido(CACHE_MAX_MB * 1024 * 1024)
+
+def clave_año(año, incluir_clusters=False, filtros_carga=None):
+    """Llave de caché de un año, con o sin perfiles de pobreza"""
+    filtros = tuple(sorted((k, tuple(v)) for k, v in (filtros_carga or {}).items() if v))
+    return (int(año), bool(incluir_clusters), filtros)
+
+@st.cache_resource
+def modelo_perfiles():
+    """Medias, escalas y centroides del K-Means de 2024 (notebook/modelo_perfiles_2024.npz)"""
+    return cargar_modelo()
+
 @st.cache_data
 def verificar_archivos_disponibles():
     """Verifica qué archivos están disponibles"""
@@ -54,33 +95,39 @@ def verificar_archivos_disponibles():
     
     return años_disponibles, archivos_info
 
-@st.cache_data
-def cargar_año_especifico(año):
+def cargar_año_especifico(año, filtros_carga=None):
     """Carga un año específico con manejo de errores"""
+    filtros_carga = filtros_carga or {}
     try:
-        df = pd.read_parquet(f'data/procesados/enigh_{año}_final_enriquecido.parquet')
-        df['Año'] = año
+        # Tabla de servicio del pipeline: columnas derivadas y tipos compactos ya vienen
+        # calculados, así que es una lectura directa a Arrow con los filtros exactos.
+        # La copia .arrow se mapea en memoria y los procesos del servidor comparten sus páginas
+        ruta = ruta_servicio_arrow(año)
+        if os.path.exists(ruta):
+            return leer_servicio_mapeado(ruta, filtros_servicio(**filtros_carga))
+        ruta = ruta_servicio(año)
+        if os.path.exists(ruta):
+            return leer_servicio(ruta, filtros_servicio(**filtros_carga))
         
-        # Crear columnas auxiliares
-        df['tiene_celular'] = (df['celular'] == 1).astype(int)
-        df['tiene_internet'] = (df['conex_inte'] == 1).astype(int)
-        df['conexion_completa'] = ((df['celular'] == 1) & (df['conex_inte'] == 1)).astype(int)
-        
-        df['condicion_pobreza'] = np.select(
-            [df['pobreza_e'] == 1, df['pobreza'] == 1],
-            ['Pobreza Extrema', 'Pobreza Moderada'], default='No Pobre'
+        # Sin tabla de servicio: solo las columnas del dashboard, con los filtros previos en pyarrow
+        df = leer_enriquecido(
+            f'data/procesados/enigh_{año}_final_enriquecido.parquet',
+            filtros_pushdown(**filtros_carga)
         )
-        df['Ambito'] = np.where(df['rururb'] == 1, 'Rural', 'Urbano')
-        df['Jefatura_Hogar'] = np.where(df['Jefatura_Mujer'] == 1, 'Mujer', 'Hombre')
-        df['Entidad_Federativa'] = df['entidad'].map(ENTIDADES_MEXICO)
+        derivar_columnas(df, año)
         
-        # Calcular gasto en celular como % del ingreso
-        df['pct_gasto_celular'] = np.where(
-            (df['ict'] > 0) & (df['ict'].notna()),
-            (df['gasto_celular'] / df['ict']) * 100, 0
-        )
+        # Los predicados de pyarrow son aproximados; la selección exacta se aplica sobre las etiquetas
+        if filtros_carga.get('condiciones'):
+            df = df[df['condicion_pobreza'].isin(filtros_carga['condiciones'])].reset_index(drop=True)
+        if filtros_carga.get('ambitos'):
+            df = df[df['Ambito'].isin(filtros_carga['ambitos'])].reset_index(drop=True)
         
-        return df.copy()
+        # Perfiles con el modelo exportado a NumPy (sin scikit-learn); sin él quedan vacíos
+        modelo = modelo_perfiles()
+        df['cluster'] = np.nan if modelo is None else asignar_clusters(df, modelo)
+        df['Perfil_Pobreza'] = df['cluster'].map(PERFILES_POBREZA)
+        # Etiquetas como categóricas, banderas en int8 y continuas en float32
+        return compactar_tipos(df)
         
     except FileNotFoundError:
         st.error(f"❌ No se encontró el archivo para el año {año}")
@@ -93,61 +140,105 @@ def cargar_año_especifico(año):
 def cargar_clusters_2024():
     """Carga los clusters solo si se selecciona 2024"""
     try:
-        df_clusters = pd.read_parquet('data/procesados/enigh_2024_clusters_pobreza_extrema.parquet')
+        df_clusters = pd.read_parquet(
+            'data/procesados/enigh_2024_clusters_pobreza_extrema.parquet',
+            columns=['folioviv', 'cluster']
+        )
         
         # Mapear perfiles
-        perfiles = {
-            0: "Aislamiento Rural Profundo", 
-            1: "Conectividad Precaria en el Campo",
-            2: "Pobreza Urbana Informal y Conectada", 
-            3: "Formales pero Vulnerables",
-            4: "Conectados con Acceso a Salud"
-        }
-        df_clusters['Perfil_Pobreza'] = df_clusters['cluster'].map(perfiles)
+        df_clusters['Perfil_Pobreza'] = df_clusters['cluster'].map(PERFILES_POBREZA)
         
         return df_clusters[['folioviv', 'cluster', 'Perfil_Pobreza']]
     except FileNotFoundError:
         st.warning("⚠️ No se encontraron los clusters de 2024")
         return pd.DataFrame()
 
-def combinar_datos_seleccionados(años_seleccionados, incluir_clusters=False):
-    """Combina solo los años seleccionados por el usuario"""
-    lista_df = []
+def tiene_perfiles(datos_año):
+    """True si algún hogar del año trae cluster asignado"""
+    if isinstance(datos_año, pa.Table):
+        return datos_año['cluster'].null_count < datos_año.num_rows
+    return bool(datos_año['cluster'].notna().any())
+
+def sin_perfiles(datos_año):
+    """Misma tabla con las columnas de perfil vacías (del mismo tipo)"""
+    if not isinstance(datos_año, pa.Table):
+        return datos_año  # sin tabla de servicio los perfiles ya vienen vacíos
+    for columna in ['cluster', 'Perfil_Pobreza']:
+        i = datos_año.schema.get_field_index(columna)
+        campo = datos_año.schema.field(i)
+        datos_año = datos_año.set_column(i, campo, pa.nulls(datos_año.num_rows, campo.type))
+    return datos_año
+
+def cargador_año(año, incluir_clusters=False, filtros_carga=None):
+    """Función que lee un año y deja o quita sus perfiles de pobreza
+
+    La tabla de servicio trae los perfiles de todos los años; sin ella se asignan al
+    leer con el modelo exportado y, si tampoco está, los de 2024 se unen desde el
+    parquet de clusters del notebook.
+    """
+    def cargar():
+        datos_año = cargar_año_especifico(año, filtros_carga)
+        
+        if not incluir_clusters:
+            return sin_perfiles(datos_año)
+        
+        if año == 2024 and len(datos_año) and not tiene_perfiles(datos_año):
+            df_clusters = cargar_clusters_2024()
+            if not df_clusters.empty:
+                df_año = datos_año.to_pandas() if isinstance(datos_año, pa.Table) else datos_año
+                df_año = df_año.drop(columns=['cluster', 'Perfil_Pobreza'])
+                return compactar_tipos(pd.merge(df_año, df_clusters, on='folioviv', how='left'))
+        
+        # Con los perfiles ya asignados, la tabla leída va directo al almacén
+        return datos_año
+    
+    return cargar
+
+def preparar_año(año, incluir_clusters=False, filtros_carga=None):
+    """Vista de solo lectura de un año preparado, compartida con las demás sesiones"""
+    return almacen_años().vista(
+        clave_año(año, incluir_clusters, filtros_carga),
+        cargador_año(año, incluir_clusters, filtros_carga)
+    )
+
+@st.cache_data
+def cubo_del_año(año, incluir_clusters=False, filtros_carga=None):
+    """Cubo de sumas ponderadas de un año; se construye una sola vez por año cargado"""
+    df_año = preparar_año(año, incluir_clusters, filtros_carga)
+    if df_año.empty:
+        return pd.DataFrame()
+    return construir_cubo(df_año)
+
+def combinar_datos_seleccionados(años_seleccionados, incluir_clusters=False, filtros_carga=None):
+    """Reserva en el almacén compartido solo los años seleccionados por el usuario
+    
+    Devuelve un préstamo: la sesión no guarda una copia de los datos, solo la referencia.
+    """
+    almacen = almacen_años()
+    cargadores = {
+        clave_año(año, incluir_clusters, filtros_carga): cargador_año(año, incluir_clusters, filtros_carga)
+        for año in años_seleccionados
+    }
     
     # Barra de progreso para la carga
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    for i, año in enumerate(años_seleccionados):
-        status_text.text(f'Cargando datos de {año}...')
+    for i, (año, (clave, cargar)) in enumerate(zip(años_seleccionados, cargadores.items())):
+        # Solo se leen del disco los años que no están ya en el almacén compartido
+        if clave in almacen:
+            status_text.text(f'Reutilizando {año} desde la caché...')
+        else:
+            status_text.text(f'Cargando datos de {año}...')
         progress_bar.progress((i + 1) / len(años_seleccionados))
-        
-        df_año = cargar_año_especifico(año)
-        if not df_año.empty:
-            lista_df.append(df_año)
+        almacen.tabla(clave, cargar)
     
     # Limpiar indicadores de progreso
     progress_bar.empty()
     status_text.empty()
     
-    if not lista_df:
-        return pd.DataFrame()
-    
-    # Combinar todos los dataframes
-    df_combinado = pd.concat(lista_df, ignore_index=True)
-    
-    # Añadir clusters si se incluye 2024
-    if incluir_clusters and 2024 in años_seleccionados:
-        status_text.text('Cargando perfiles de pobreza...')
-        df_clusters = cargar_clusters_2024()
-        if not df_clusters.empty:
-            df_combinado = pd.merge(df_combinado, df_clusters, on='folioviv', how='left')
-        status_text.empty()
-    else:
-        df_combinado['cluster'] = np.nan
-        df_combinado['Perfil_Pobreza'] = np.nan
-    
-    return df_combinado
+    # Los perfiles ya vienen unidos por año; la combinación se comparte entre sesiones
+    return almacen.prestar(cargadores)
 
 def mostrar_selector_datos_inteligente():
     """Interfaz mejorada para selección de datos"""
@@ -159,7 +250,7 @@ def mostrar_selector_datos_inteligente():
     
     if not años_disponibles:
         st.sidebar.error("❌ No se encontraron archivos de datos")
-        return [], False
+        return [], False, {}
     
     # Mostrar información de archivos
     with st.sidebar.expander("ℹ️ Archivos Disponibles"):
@@ -218,48 +309,76 @@ def mostrar_selector_datos_inteligente():
             else:
                 st.sidebar.info(f"📊 Carga estimada: {total_mb:.1f} MB")
     
-    # Opción de clusters (solo si incluye 2024)
-    incluir_clusters = False
-    if 2024 in años_seleccionados:
-        incluir_clusters = st.sidebar.checkbox(
-            "🎭 Incluir Perfiles de Pobreza (Clusters 2024)",
-            value=True,
-            help="Análisis ML de patrones de pobreza extrema"
+    # Perfiles de pobreza extrema (asignados por el pipeline a todos los años)
+    incluir_clusters = st.sidebar.checkbox(
+        "🎭 Incluir Perfiles de Pobreza (Clusters)",
+        value=True,
+        help="Análisis ML de patrones de pobreza extrema, con el modelo entrenado en 2024"
+    )
+    
+    # Filtros que se aplican al leer los archivos (menos filas en memoria)
+    with st.sidebar.expander("🧹 Filtros Previos a la Carga (opcional)"):
+        condiciones_carga = st.multiselect(
+            'Leer solo estas condiciones:',
+            CONDICIONES_POBREZA,
+            key='carga_condiciones',
+            help="Solo se leen los hogares en estas condiciones"
+        )
+        estados_carga = st.multiselect(
+            'Leer solo estas entidades:',
+            list(ENTIDADES_MEXICO.keys()),
+            format_func=ENTIDADES_MEXICO.get,
+            key='carga_entidades',
+            help="Solo se leen los hogares de estas entidades"
+        )
+        ambitos_carga = st.multiselect(
+            'Leer solo estos ámbitos:',
+            ['Urbano', 'Rural'],
+            key='carga_ambitos',
+            help="Solo se leen los hogares de este ámbito"
         )
     
-    return años_seleccionados, incluir_clusters
+    filtros_carga = {
+        'condiciones': condiciones_carga,
+        'entidades': estados_carga,
+        'ambitos': ambitos_carga
+    }
+    
+    return años_seleccionados, incluir_clusters, filtros_carga
 
 def cargar_datos_bajo_demanda():
     """Función principal que reemplaza cargar_datos_completos()"""
     
-    años_seleccionados, incluir_clusters = mostrar_selector_datos_inteligente()
+    años_seleccionados, incluir_clusters, filtros_carga = mostrar_selector_datos_inteligente()
     
     if not años_seleccionados:
         st.error("⚠️ Selecciona al menos un año para continuar")
-        return pd.DataFrame()
+        return None
     
     # Botón de carga con confirmación
     if st.sidebar.button("🔄 Cargar/Actualizar Datos", type="primary"):
-        # Limpiar cache si es necesario
-        st.cache_data.clear()
-        
         with st.spinner('⏳ Cargando datos seleccionados...'):
-            df_datos = combinar_datos_seleccionados(años_seleccionados, incluir_clusters)
+            prestamo = combinar_datos_seleccionados(años_seleccionados, incluir_clusters, filtros_carga)
+            df_datos = prestamo.datos()
             
             if df_datos.empty:
                 st.error("❌ No se pudieron cargar los datos")
-                return pd.DataFrame()
+                return None
             
-            # Guardar en session_state para evitar recargas
-            st.session_state['datos_cargados'] = df_datos
+            # La sesión guarda solo el préstamo, no una copia del DataFrame
+            st.session_state['datos_cargados'] = prestamo
+            st.session_state.pop('prestamo_inicial', None)
             st.session_state['años_cargados'] = años_seleccionados
             st.session_state['clusters_incluidos'] = incluir_clusters
+            st.session_state['filtros_carga'] = filtros_carga
             
             st.sidebar.success(f"✅ Datos cargados: {len(df_datos):,} registros")
     
     # Recuperar datos del session_state si existen
     if 'datos_cargados' in st.session_state:
-        df_final = st.session_state['datos_cargados']
+        prestamo = st.session_state['datos_cargados']
+        df_final = prestamo.datos()
+        memoria_mb = df_final.memory_usage(deep=True).sum() / 1024 / 1024
         
         # Mostrar información de los datos cargados
         st.sidebar.markdown("### 📋 Datos en Memoria")
@@ -267,19 +386,75 @@ def cargar_datos_bajo_demanda():
         **Registros**: {len(df_final):,}
         **Años**: {', '.join(map(str, st.session_state['años_cargados']))}
         **Clusters**: {'✅' if st.session_state['clusters_incluidos'] else '❌'}
-        **Memoria**: ~{len(df_final) * 50 / 1024 / 1024:.1f} MB
+        **Memoria (compartida)**: {memoria_mb:.1f} MB
+        **Almacén del servidor**: {almacen_años().bytes_usados / 1024 / 1024:.1f} / {CACHE_MAX_MB:.0f} MB
         """)
         
-        return df_final
+        return prestamo
     
     else:
         # Primera carga: cargar año más reciente por defecto
         años_disponibles, _ = verificar_archivos_disponibles()
         if años_disponibles:
             st.sidebar.info("👆 Haz clic en 'Cargar/Actualizar Datos' para comenzar")
-            return cargar_año_especifico(max(años_disponibles))
+            año_reciente = max(años_disponibles)
+            if 'prestamo_inicial' not in st.session_state:
+                st.session_state['prestamo_inicial'] = almacen_años().prestar(
+                    {clave_año(año_reciente): cargador_año(año_reciente)}
+                )
+            return st.session_state['prestamo_inicial']
         else:
-            return pd.DataFrame()
+            return None
+
+def figura_histograma(bordes, conteos, titulo, etiqueta_x):
+    """Barras contiguas a partir de intervalos ya agregados (solo bordes y alturas)"""
+    fig = go.Figure(go.Bar(
+        x=(bordes[:-1] + bordes[1:]) / 2, y=conteos, width=np.diff(bordes),
+        customdata=np.column_stack([bordes[:-1], bordes[1:]]),
+        hovertemplate='%{customdata[0]:,.2f} – %{customdata[1]:,.2f}<br>%{y:,.0f} hogares<extra></extra>'
+    ))
+    fig.update_layout(
+        title=titulo, xaxis_title=etiqueta_x, yaxis_title='Número de Hogares (expandido)',
+        bargap=0, height=400
+    )
+    return fig
+
+@st.cache_resource
+def figura_base_mapa(nivel):
+    """Coropleta de las 32 entidades con la geometría del nivel, o None si no se ha generado
+
+    La geometría y el trazo se arman una vez por proceso: cada indicador solo
+    cambia los 32 valores (`z`) de una copia.
+    """
+    geometria = leer_geometria(nivel)
+    if geometria is None:
+        return None
+    codigos = [entidad['id'] for entidad in geometria['features']]
+    fig = go.Figure(go.Choropleth(
+        geojson=geometria, featureidkey='id', locations=codigos, z=np.zeros(len(codigos)),
+        text=[ENTIDADES_MEXICO[c] for c in codigos], colorscale='Viridis',
+        marker_line_width=0.5, marker_line_color='white',
+        hovertemplate='%{text}<br>%{z:,.1f}<extra></extra>'
+    ))
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(height=550, margin=dict(l=0, r=0, t=10, b=0))
+    return fig
+
+def figura_mapa(nivel, valores, etiqueta, entidad=None):
+    """Copia de la coropleta base con los valores del indicador (acercada a `entidad` si se indica)"""
+    fig = go.Figure(figura_base_mapa(nivel))
+    fig.update_traces(z=valores, colorbar_title=etiqueta)
+    if entidad is not None:
+        lon_min, lat_min, lon_max, lat_max = next(
+            e['bbox'] for e in fig.data[0].geojson['features'] if e['id'] == entidad
+        )
+        margen = 0.1 * max(lon_max - lon_min, lat_max - lat_min)
+        fig.update_geos(
+            fitbounds=False,
+            lonaxis_range=[lon_min - margen, lon_max + margen],
+            lataxis_range=[lat_min - margen, lat_max + margen]
+        )
+    return fig
 
 # --- HEADER MEJORADO ---
 st.markdown("""
@@ -311,7 +486,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- CARGA DE DATOS OPTIMIZADA ---
-df_original = cargar_datos_bajo_demanda()
+prestamo_datos = cargar_datos_bajo_demanda()
+df_original = prestamo_datos.datos() if prestamo_datos is not None else pd.DataFrame()
 
 if df_original.empty:
     st.info("👆 Configura la carga de datos en la barra lateral para comenzar")
@@ -360,13 +536,13 @@ perfiles_disponibles = sorted(df_original['Perfil_Pobreza'].dropna().unique()) i
 
 if perfiles_disponibles:
     perfil_seleccionado = st.sidebar.multiselect(
-        'Perfiles (Clusters 2024):', 
+        'Perfiles (Clusters):', 
         perfiles_disponibles, 
         default=perfiles_disponibles,
         help="Basado en clustering ML de hogares en pobreza extrema"
     )
 else:
-    st.sidebar.info("ℹ️ Incluye datos de 2024 con clusters para ver perfiles")
+    st.sidebar.info("ℹ️ Incluye los perfiles de pobreza al cargar para filtrarlos")
     perfil_seleccionado = []
 
 # Estados disponibles en los datos cargados
@@ -380,63 +556,120 @@ estado_especifico = st.sidebar.selectbox(
 
 # --- INDICADOR DE USO DE MEMORIA ---
 if len(df_original) > 0:
-    memoria_aprox = len(df_original) * 50 / 1024 / 1024  # Aproximación en MB
-    color_memoria = "🟢" if memoria_aprox < 20 else "🟡" if memoria_aprox < 40 else "🔴"
+    memoria_real = df_original.memory_usage(deep=True).sum() / 1024 / 1024  # Medición real en MB
+    color_memoria = "🟢" if memoria_real < 20 else "🟡" if memoria_real < 40 else "🔴"
     
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"""
     ### 💾 Estado de Memoria
-    {color_memoria} **{memoria_aprox:.1f} MB** en uso  
+    {color_memoria} **{memoria_real:.1f} MB** en uso  
     📊 **{len(df_original):,}** registros cargados
     """)
     
-    if memoria_aprox > 40:
+    if memoria_real > 40:
         st.sidebar.warning("⚠️ Uso alto de memoria. Considera reducir años.")
 
-# OPCIONAL: Botón para limpiar memoria
-if st.sidebar.button("🗑️ Limpiar Memoria", help="Limpia datos cargados y cache"):
-    st.cache_data.clear()
+# OPCIONAL: Botón para limpiar memoria (solo de esta sesión; la caché compartida se acota sola)
+if st.sidebar.button("🗑️ Limpiar Memoria", help="Libera los datos cargados en esta sesión"):
+    st.session_state.pop('prestamo_inicial', None)
     if 'datos_cargados' in st.session_state:
         del st.session_state['datos_cargados']
         del st.session_state['años_cargados'] 
         del st.session_state['clusters_incluidos']
+        st.session_state.pop('filtros_carga', None)
     st.rerun()
 
 # --- APLICAR FILTROS ---
-df_filtrado = df_original[
-    (df_original['Año'].isin(años_seleccionados_filtro))
-]
-
+# Valores permitidos por dimensión; None deja pasar a los hogares sin perfil
+filtros_activos = {'Año': años_seleccionados_filtro}
 if pobreza_seleccionada:
-    df_filtrado = df_filtrado[df_filtrado['condicion_pobreza'].isin(pobreza_seleccionada)]
-
+    filtros_activos['condicion_pobreza'] = pobreza_seleccionada
 if perfiles_disponibles and perfil_seleccionado:
-    df_filtrado = df_filtrado[
-        (df_filtrado['Perfil_Pobreza'].isin(perfil_seleccionado)) | 
-        (df_filtrado['Perfil_Pobreza'].isnull())
-    ]
-
+    filtros_activos['Perfil_Pobreza'] = perfil_seleccionado + [None]
 if ambito_seleccionado != 'Todos':
-    df_filtrado = df_filtrado[df_filtrado['Ambito'] == ambito_seleccionado]
+    filtros_activos['Ambito'] = [ambito_seleccionado]
 if jefatura_seleccionada != 'Ambos':
-    df_filtrado = df_filtrado[df_filtrado['Jefatura_Hogar'] == jefatura_seleccionada]
+    filtros_activos['Jefatura_Hogar'] = [jefatura_seleccionada]
 if estado_especifico != 'Todos los Estados':
-    df_filtrado = df_filtrado[df_filtrado['Entidad_Federativa'] == estado_especifico]
+    filtros_activos['Entidad_Federativa'] = [estado_especifico]
+
+años_en_memoria = st.session_state.get('años_cargados', años_disponibles_en_datos)
+clusters_en_memoria = st.session_state.get('clusters_incluidos', False)
+filtros_en_memoria = st.session_state.get('filtros_carga')
+
+# --- GRAFO DE CÁLCULOS ---
+# Cada cálculo es un nodo memoizado con la firma exacta de sus entradas: un widget
+# solo recalcula lo que queda aguas abajo de él, y volver a una selección previa es inmediato
+grafo = Grafo(st.session_state.setdefault('grafo_exploracion', {}))
+grafo.entrada('datos', prestamo_datos, firma=prestamo_datos.claves)
+grafo.entrada('carga', (años_en_memoria, clusters_en_memoria, filtros_en_memoria))
+grafo.entrada('filtros', filtros_activos)
+
+@grafo.nodo('cubo', ['carga'], max_entradas=2)
+def _(carga):
+    # El cubo se construye una vez por año cargado; cada cambio de filtro solo suma celdas
+    años, clusters, filtros_carga = carga
+    return pd.concat([cubo_del_año(año, clusters, filtros_carga) for año in años], ignore_index=True)
+
+@grafo.nodo('celdas', ['cubo', 'filtros'])
+def _(cubo, filtros):
+    return cubo[mascara(cubo, filtros)]
+
+@grafo.nodo('resumen', ['celdas'])
+def _(celdas):
+    metricas_cubo = {k: v for k, v in METRICAS_SELECCION.items() if v[1] in celdas.columns}
+    return metricas_desde_sumas(celdas, 'factor', metricas_cubo).iloc[0]
+
+@grafo.nodo('filas', ['datos', 'filtros'], max_entradas=2)
+def _(datos, filtros):
+    # Las distribuciones y la tabla de detalle usan los hogares: el índice de bitmaps
+    # (compartido entre sesiones) da la selección con unos cuantos AND/OR de bits
+    indice_filtros = datos.derivado('indice_filtros', lambda df: IndiceBitmap(df, DIMENSIONES))
+    return indice_filtros.seleccionar(filtros)
+
+def errores_de_diseño(datos, filas, metricas, por=None):
+    """Estimación y error estándar (bootstrap por UPM) o None si los datos no traen el diseño muestral"""
+    df = datos.datos()
+    if not {'upm', 'est_dis'} <= set(df.columns):
+        return None
+    # Los multiplicadores de las réplicas se generan una vez por conjunto de datos
+    replicas = datos.derivado('replicas_bootstrap', ReplicasBootstrap)
+    metricas = {k: v for k, v in metricas.items() if v[1] in df.columns}
+    return replicas.errores(df, filas, metricas, por=por)
+
+@grafo.nodo('errores', ['datos', 'filas'])
+def _(datos, filas):
+    errores = errores_de_diseño(datos, filas, METRICAS_SELECCION)
+    return None if errores is None else errores.iloc[0]
+
+def rango(nombre, formato):
+    """'a – b': intervalo al 95% de una métrica del resumen"""
+    inferior, superior = intervalo(errores[nombre], errores[f'{nombre}_ee'])
+    return f"{formato.format(inferior)} – {formato.format(superior)}"
+
+def texto_intervalo(nombre, formato):
+    """' IC 95%: a – b.' para la ayuda de una métrica, o vacío sin diseño muestral"""
+    return '' if errores is None else f" IC 95%: {rango(nombre, formato)}."
+
+celdas = grafo['celdas']
+filas_seleccion = grafo['filas']
 
 # --- VALIDACIÓN Y MÉTRICAS ---
-if df_filtrado.empty:
+if celdas['registros'].sum() == 0:
     st.error("❌ Tu selección no arrojó ningún resultado. Ajusta los filtros.")
     st.stop()
 
 st.header('📊 Resultados de tu Selección', divider='blue')
 
-# Calcular métricas ponderadas
-total_hogares = int(df_filtrado['factor'].sum())
-acceso_celular = (df_filtrado['tiene_celular'] * df_filtrado['factor']).sum() / total_hogares * 100
-acceso_internet = (df_filtrado['tiene_internet'] * df_filtrado['factor']).sum() / total_hogares * 100
-conexion_completa = (df_filtrado['conexion_completa'] * df_filtrado['factor']).sum() / total_hogares * 100
-ingreso_promedio = (df_filtrado['ictpc'] * df_filtrado['factor']).sum() / total_hogares
-gasto_celular_prom = (df_filtrado['pct_gasto_celular'] * df_filtrado['factor']).sum() / total_hogares
+# Calcular métricas ponderadas a partir del cubo
+resumen = grafo['resumen']
+total_hogares = int(resumen['Hogares'])
+acceso_celular = resumen['Acceso_Celular']
+acceso_internet = resumen['Acceso_Internet']
+conexion_completa = resumen['Conexion_Completa']
+ingreso_promedio = resumen['Ingreso_Promedio']
+gasto_celular_prom = resumen['Gasto_Celular_Pct']
+errores = grafo['errores']
 
 # Dashboard de métricas
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -444,29 +677,36 @@ col1, col2, col3, col4, col5 = st.columns(5)
 col1.metric(
     "🏠 Hogares", 
     f"{total_hogares:,.0f}",
-    help="Estimación poblacional con factores de expansión"
+    help="Estimación poblacional con factores de expansión." + texto_intervalo('Hogares', '{:,.0f}')
 )
 col2.metric(
     "📱 Acceso Celular", 
     f"{acceso_celular:.1f}%",
-    help="Porcentaje de hogares con al menos un celular"
+    help="Porcentaje de hogares con al menos un celular." + texto_intervalo('Acceso_Celular', '{:.1f}%')
 )
 col3.metric(
     "🌐 Con Internet", 
     f"{acceso_internet:.1f}%",
-    help="Porcentaje con internet en el hogar"
+    help="Porcentaje con internet en el hogar." + texto_intervalo('Acceso_Internet', '{:.1f}%')
 )
 col4.metric(
     "💰 Ingreso P.C.", 
     f"${ingreso_promedio:,.0f}",
-    help="Ingreso corriente total per cápita mensual"
+    help="Ingreso corriente total per cápita mensual." + texto_intervalo('Ingreso_Promedio', '${:,.0f}')
 )
 col5.metric(
     "📊 Gasto Celular", 
     f"{gasto_celular_prom:.1f}%",
-    help="% del ingreso destinado a gastos de celular"
+    help="% del ingreso destinado a gastos de celular." + texto_intervalo('Gasto_Celular_Pct', '{:.2f}%')
 )
 
+if errores is not None:
+    st.caption(
+        f"Intervalos de confianza al 95% ({REPLICAS} réplicas bootstrap por UPM, diseño de la ENIGH): "
+        f"celular {rango('Acceso_Celular', '{:.1f}%')} · internet {rango('Acceso_Internet', '{:.1f}%')} · "
+        f"ingreso {rango('Ingreso_Promedio', '${:,.0f}')}"
+    )
+
 st.markdown("---")
 
 # --- VISUALIZACIONES PRINCIPALES ---
@@ -480,14 +720,16 @@ with tab1:
     
     if len(años_seleccionados_filtro) > 1:
         # Evolución por año
-        evolucion_df = df_filtrado.groupby('Año').apply(
-            lambda x: pd.Series({
-                'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
-                'Acceso_Internet': (x['tiene_internet'] * x['factor']).sum() / x['factor'].sum() * 100,
-                'Conexion_Completa': (x['conexion_completa'] * x['factor']).sum() / x['factor'].sum() * 100,
-                'Hogares': x['factor'].sum()
-            })
-        ).reset_index()
+        @grafo.nodo('evolucion', ['celdas'])
+        def _(celdas):
+            return metricas_desde_sumas(celdas, 'factor', {
+                'Acceso_Celular': METRICAS_SELECCION['Acceso_Celular'],
+                'Acceso_Internet': METRICAS_SELECCION['Acceso_Internet'],
+                'Conexion_Completa': METRICAS_SELECCION['Conexion_Completa'],
+                'Hogares': METRICAS_SELECCION['Hogares']
+            }, por='Año')
+
+        evolucion_df = grafo['evolucion']
         
         # Gráfico de líneas múltiples
         fig_evolucion = go.Figure()
@@ -533,11 +775,13 @@ with tab2:
     carencias_data = []
     
     for carencia in carencias_cols:
-        if carencia in df_filtrado.columns:
-            porcentaje = (df_filtrado[carencia] * df_filtrado['factor']).sum() / total_hogares * 100
+        if carencia in resumen.index:
+            porcentaje = resumen[carencia]
             carencias_data.append({
                 'Carencia': NOMBRES_CARENCIAS[carencia],
-                'Porcentaje': porcentaje
+                'Porcentaje': porcentaje,
+                # Semiamplitud del intervalo al 95% (0 si no hay diseño muestral)
+                'Margen': Z_95 * errores[f'{carencia}_ee'] if errores is not None else 0.0
             })
     
     if carencias_data:
@@ -549,7 +793,7 @@ with tab2:
             # Gráfico de barras horizontales mejorado
             fig_carencias = px.bar(
                 df_carencias, y='Carencia', x='Porcentaje',
-                orientation='h', text_auto='.1f',
+                orientation='h', text_auto='.1f', error_x='Margen',
                 title='Porcentaje de Hogares con Cada Carencia',
                 color='Porcentaje', color_continuous_scale='Reds'
             )
@@ -568,14 +812,17 @@ with tab2:
                 )
         
         # Análisis de carencias por ámbito si no hay filtro específico
-        if ambito_seleccionado == 'Todos' and len(df_filtrado['Ambito'].unique()) > 1:
+        if ambito_seleccionado == 'Todos' and celdas['Ambito'].nunique() > 1:
             st.markdown("**🏙️ Comparación Urbano vs Rural:**")
-            comparacion_ambito = df_filtrado.groupby('Ambito').apply(
-                lambda x: pd.Series({
-                    NOMBRES_CARENCIAS[carencia]: (x[carencia] * x['factor']).sum() / x['factor'].sum() * 100
-                    for carencia in carencias_cols if carencia in x.columns
-                })
-            ).reset_index()
+
+            @grafo.nodo('comparacion_ambito', ['celdas'])
+            def _(celdas):
+                return metricas_desde_sumas(celdas, 'factor', {
+                    NOMBRES_CARENCIAS[carencia]: (PROPORCION, carencia)
+                    for carencia in carencias_cols if carencia in celdas.columns
+                }, por='Ambito')
+
+            comparacion_ambito = grafo['comparacion_ambito']
             
             fig_comparacion = px.bar(
                 comparacion_ambito.melt(id_vars='Ambito', var_name='Carencia', value_name='Porcentaje'),
@@ -590,14 +837,59 @@ with tab2:
 with tab3:
     st.subheader("Distribución por Entidad Federativa")
     
+    # Mapa: todos los indicadores por entidad salen de las celdas en una sola agrupación,
+    # así que cambiar de indicador no recalcula nada
+    @grafo.nodo('indicadores_estados', ['celdas'])
+    def _(celdas):
+        metricas_cubo = {k: v for k, v in METRICAS_SELECCION.items() if v[1] in celdas.columns}
+        por_estado = metricas_desde_sumas(celdas, 'factor', metricas_cubo, por='Entidad_Federativa')
+        codigos = {nombre: codigo for codigo, nombre in ENTIDADES_MEXICO.items()}
+        por_estado.index = por_estado['Entidad_Federativa'].astype(str).map(codigos)
+        return por_estado.reindex(list(ENTIDADES_MEXICO))
+
+    indicadores_estados = grafo['indicadores_estados']
+    opciones_mapa = [k for k in INDICADORES_MAPA if k in indicadores_estados.columns]
+    indicador_mapa = st.selectbox(
+        "Indicador del mapa:", opciones_mapa, format_func=INDICADORES_MAPA.get, key='indicador_mapa'
+    )
+    # Con una entidad seleccionada el mapa se acerca a ella con la geometría de más detalle
+    entidad_mapa = next((c for c, n in ENTIDADES_MEXICO.items() if n == estado_especifico), None)
+    nivel_mapa = 'nacional' if entidad_mapa is None else 'estatal'
+    if figura_base_mapa(nivel_mapa) is None:
+        st.info("No se encontró la geometría simplificada; genérala con `python -m enigh.etl --solo-geometria`")
+    else:
+        st.plotly_chart(
+            figura_mapa(nivel_mapa, indicadores_estados[indicador_mapa].to_numpy(),
+                        INDICADORES_MAPA[indicador_mapa], entidad_mapa),
+            use_container_width=True
+        )
+
     # Top 10 estados con más hogares en la selección
-    estados_df = df_filtrado.groupby('Entidad_Federativa').apply(
-        lambda x: pd.Series({
-            'Hogares': x['factor'].sum(),
-            'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
-            'Ingreso_Promedio': (x['ictpc'] * x['factor']).sum() / x['factor'].sum()
-        })
-    ).reset_index().sort_values('Hogares', ascending=False)
+    @grafo.nodo('estados', ['celdas'])
+    def _(celdas):
+        return metricas_desde_sumas(celdas, 'factor', {
+            'Hogares': METRICAS_SELECCION['Hogares'],
+            'Acceso_Celular': METRICAS_SELECCION['Acceso_Celular'],
+            'Ingreso_Promedio': METRICAS_SELECCION['Ingreso_Promedio']
+        }, por='Entidad_Federativa').sort_values('Hogares', ascending=False)
+
+    estados_df = grafo['estados']
+
+    @grafo.nodo('errores_estados', ['datos', 'filas'])
+    def _(datos, filas):
+        # Los cortes por estado descansan en pocas UPM: su margen de error se muestra junto al valor
+        return errores_de_diseño(datos, filas, {
+            'Acceso_Celular': METRICAS_SELECCION['Acceso_Celular'],
+            'Ingreso_Promedio': METRICAS_SELECCION['Ingreso_Promedio']
+        }, por='Entidad_Federativa')
+
+    errores_estados = grafo['errores_estados']
+    if errores_estados is not None:
+        margenes = errores_estados.set_index('Entidad_Federativa')[['Acceso_Celular_ee', 'Ingreso_Promedio_ee']] * Z_95
+        estados_df = estados_df.join(
+            margenes.rename(columns={'Acceso_Celular_ee': 'Margen_Celular', 'Ingreso_Promedio_ee': 'Margen_Ingreso'}),
+            on='Entidad_Federativa'
+        )
     
     col1, col2 = st.columns([2, 1])
     
@@ -617,10 +909,11 @@ with tab3:
     with col2:
         st.markdown("**🏆 Top 5 Estados:**")
         for idx, row in estados_df.head(5).iterrows():
+            margen = f" ± {row['Margen_Celular']:.1f}" if 'Margen_Celular' in row else ''
             st.metric(
                 row['Entidad_Federativa'],
                 f"{int(row['Hogares']):,} hogares",
-                f"{row['Acceso_Celular']:.1f}% celular"
+                f"{row['Acceso_Celular']:.1f}%{margen} celular"
             )
     
     # Gráfico de dispersión: Acceso vs Ingreso por estado
@@ -629,7 +922,9 @@ with tab3:
         estados_df[estados_df['Hogares'] > 1000],  # Solo estados con datos significativos
         x='Ingreso_Promedio', y='Acceso_Celular',
         size='Hogares', hover_name='Entidad_Federativa',
-        title='Acceso a Celular vs Ingreso Promedio por Estado',
+        error_x='Margen_Ingreso' if 'Margen_Ingreso' in estados_df.columns else None,
+        error_y='Margen_Celular' if 'Margen_Celular' in estados_df.columns else None,
+        title='Acceso a Celular vs Ingreso Promedio por Estado (IC 95%)',
         labels={'Ingreso_Promedio': 'Ingreso Per Cápita (MXN)', 'Acceso_Celular': 'Acceso a Celular (%)'}
     )
     fig_scatter.update_layout(height=500)
@@ -643,42 +938,69 @@ with tab4:
     with col1:
         # Histograma de ingresos
         st.markdown("**💰 Distribución del Ingreso Per Cápita**")
-        fig_ingreso = px.histogram(
-            df_filtrado[df_filtrado['ictpc'] < df_filtrado['ictpc'].quantile(0.95)],  # Sin outliers
-            x='ictpc', nbins=50,
-            title='Distribución del Ingreso Per Cápita (sin outliers)',
-            labels={'ictpc': 'Ingreso Per Cápita (MXN)', 'count': 'Número de Hogares'}
-        )
-        fig_ingreso.update_layout(height=400)
-        st.plotly_chart(fig_ingreso, use_container_width=True)
+
+        @grafo.nodo('histograma_ingreso', ['datos', 'filtros'])
+        def _(datos, filtros):
+            histogramas = datos.derivado('histograma_ictpc', lambda df: HistogramasPorCelda(
+                df, DIMENSIONES, 'ictpc', bordes_finos(df['ictpc'])
+            ))
+            bordes, conteos = agrupar_intervalos(
+                histogramas.bordes, histogramas.histograma(filtros), 50, cuantil=0.95  # Sin outliers
+            )
+            return figura_histograma(
+                bordes, conteos,
+                titulo='Distribución del Ingreso Per Cápita (sin outliers)',
+                etiqueta_x='Ingreso Per Cápita (MXN)'
+            )
+
+        st.plotly_chart(grafo['histograma_ingreso'], use_container_width=True)
     
     with col2:
         # Gasto en celular
         st.markdown("**📱 Gasto en Celular (% del Ingreso)**")
-        fig_gasto = px.histogram(
-            df_filtrado[df_filtrado['pct_gasto_celular'] < 10],  # Filtrar casos extremos
-            x='pct_gasto_celular', nbins=30,
-            title='% del Ingreso Destinado al Celular',
-            labels={'pct_gasto_celular': '% del Ingreso', 'count': 'Número de Hogares'}
-        )
-        fig_gasto.update_layout(height=400)
-        st.plotly_chart(fig_gasto, use_container_width=True)
+
+        @grafo.nodo('histograma_gasto', ['datos', 'filtros'])
+        def _(datos, filtros):
+            histogramas = datos.derivado('histograma_pct_gasto_celular', lambda df: HistogramasPorCelda(
+                df, DIMENSIONES, 'pct_gasto_celular', np.linspace(0, 10, 31)  # Filtrar casos extremos
+            ))
+            return figura_histograma(
+                histogramas.bordes, histogramas.histograma(filtros),
+                titulo='% del Ingreso Destinado al Celular',
+                etiqueta_x='% del Ingreso'
+            )
+
+        st.plotly_chart(grafo['histograma_gasto'], use_container_width=True)
     
     # Análisis de correlación
     st.markdown("**🔗 Relación entre Variables Económicas y Tecnológicas**")
     
-    # Crear deciles de ingreso
-    df_filtrado_copy = df_filtrado.copy()
-    df_filtrado_copy['Decil_Ingreso'] = pd.qcut(df_filtrado_copy['ictpc'], q=10, labels=[f'D{i}' for i in range(1,11)])
-    
-    deciles_df = df_filtrado_copy.groupby('Decil_Ingreso').apply(
-        lambda x: pd.Series({
-            'Ingreso_Promedio': (x['ictpc'] * x['factor']).sum() / x['factor'].sum(),
-            'Acceso_Celular': (x['tiene_celular'] * x['factor']).sum() / x['factor'].sum() * 100,
-            'Acceso_Internet': (x['tiene_internet'] * x['factor']).sum() / x['factor'].sum() * 100,
-            'Gasto_Celular_Pct': (x['pct_gasto_celular'] * x['factor']).sum() / x['factor'].sum()
-        })
-    ).reset_index()
+    # Crear deciles de ingreso ponderados por el factor de expansión: la selección se
+    # ordena a partir del orden de ictpc calculado una vez por conjunto de datos
+    @grafo.nodo('deciles', ['datos', 'filas'])
+    def _(datos, filas):
+        df = datos.datos()
+        orden_ingreso = datos.derivado('orden_ictpc', lambda df: IndiceOrdenado(df, 'ictpc'))
+        posiciones = orden_ingreso.ordenar(filas)
+        codigos = codigos_cuantiles(
+            df['ictpc'].to_numpy(dtype='float64')[posiciones],
+            df['factor'].to_numpy(dtype='float64')[posiciones],
+            q=10
+        )
+        metricas_deciles = {
+            'Ingreso_Promedio': METRICAS_SELECCION['Ingreso_Promedio'],
+            'Acceso_Celular': METRICAS_SELECCION['Acceso_Celular'],
+            'Acceso_Internet': METRICAS_SELECCION['Acceso_Internet'],
+            'Gasto_Celular_Pct': METRICAS_SELECCION['Gasto_Celular_Pct']
+        }
+        sumas = sumas_por_cuantil(
+            df, posiciones, codigos, 10, 'factor',
+            sorted({col for _, col in metricas_deciles.values()}),
+            nombre='Decil_Ingreso', etiquetas=[f'D{i}' for i in range(1,11)]
+        )
+        return metricas_desde_sumas(sumas[sumas['registros'] > 0], 'factor', metricas_deciles, por='Decil_Ingreso')
+
+    deciles_df = grafo['deciles']
     
     fig_deciles = make_subplots(
         rows=2, cols=2,
@@ -728,7 +1050,7 @@ columnas_disponibles = {
 }
 
 # Filtrar columnas que realmente existen en los datos
-columnas_existentes = {k: v for k, v in columnas_disponibles.items() if k in df_filtrado.columns}
+columnas_existentes = {k: v for k, v in columnas_disponibles.items() if k in df_original.columns}
 
 columnas_seleccionadas = st.multiselect(
     "Selecciona las columnas:",
@@ -737,38 +1059,101 @@ columnas_seleccionadas = st.multiselect(
     format_func=lambda x: columnas_existentes[x]
 )
 
+# Búsqueda, orden y página: solo la página visible se envía al navegador
+col_buscar, col_orden, col_sentido, col_tamaño = st.columns([3, 2, 1, 1])
+busqueda = col_buscar.text_input(
+    "🔎 Buscar estado o perfil:", key='busqueda_detalle',
+    placeholder="p. ej. oaxaca, rural profundo"
+)
+orden_por = col_orden.selectbox(
+    "Ordenar por:", [None] + list(columnas_existentes), key='orden_detalle',
+    format_func=lambda x: 'Sin orden' if x is None else columnas_existentes[x]
+)
+descendente = col_sentido.toggle("Descendente", key='descendente_detalle', disabled=orden_por is None)
+tamaño_pagina = col_tamaño.selectbox("Filas por página:", TAMAÑOS_PAGINA, index=2, key='tamaño_pagina_detalle')
+
+grafo.entrada('vista_detalle', (busqueda.strip(), orden_por, descendente))
+
+@grafo.nodo('filas_detalle', ['datos', 'filas', 'vista_detalle'], max_entradas=2)
+def _(datos, filas, vista):
+    texto, columna, descendente = vista
+    if texto:
+        filas = filas[coincidencias(datos.datos(), texto)[filas]]
+    if columna:
+        # El argsort de cada columna se calcula una vez por conjunto de datos
+        orden = datos.derivado(f'orden_detalle_{columna}', lambda df: OrdenColumna(df, columna))
+        filas = orden.ordenar(filas, descendente)
+    return filas
+
+filas_detalle = grafo['filas_detalle']
+
+# Una búsqueda, orden o filtro nuevo regresa a la primera página
+firma_vista = congelar((filtros_activos, busqueda.strip(), orden_por, descendente, tamaño_pagina))
+if st.session_state.get('firma_vista_detalle') != firma_vista:
+    st.session_state['firma_vista_detalle'] = firma_vista
+    st.session_state['pagina_detalle'] = 1
+paginas_detalle = total_paginas(filas_detalle, tamaño_pagina)
+st.session_state['pagina_detalle'] = min(st.session_state.get('pagina_detalle', 1), paginas_detalle)
+
 if columnas_seleccionadas:
-    # Mostrar muestra de los datos
-    muestra_datos = df_filtrado[columnas_seleccionadas].head(1000)  # Limitar para performance
+    posiciones_pagina = pagina(filas_detalle, st.session_state['pagina_detalle'], tamaño_pagina)
     st.dataframe(
-        muestra_datos,
+        df_original[columnas_seleccionadas].take(posiciones_pagina),
         use_container_width=True,
+        hide_index=True,
         column_config={
             'ictpc': st.column_config.NumberColumn('Ingreso PC', format="$%.2f"),
             'pct_gasto_celular': st.column_config.NumberColumn('% Gasto Celular', format="%.2f%%"),
             'factor': st.column_config.NumberColumn('Factor Expansión', format="%.0f")
         }
     )
-    
-    if len(df_filtrado) > 1000:
-        st.info(f"💡 Mostrando las primeras 1,000 filas de {len(df_filtrado):,} registros totales")
+
+    col_pagina, col_rango = st.columns([1, 3])
+    numero_pagina = col_pagina.number_input(
+        f"Página (de {paginas_detalle:,}):", min_value=1, max_value=paginas_detalle, step=1, key='pagina_detalle'
+    )
+    primera = (numero_pagina - 1) * tamaño_pagina
+    col_rango.caption(
+        f"Filas {min(primera + 1, len(filas_detalle)):,}–{primera + len(posiciones_pagina):,} "
+        f"de {len(filas_detalle):,}" + (f" que coinciden con «{busqueda.strip()}»" if busqueda.strip() else '')
+        + f" ({len(filas_seleccion):,} registros en la selección)"
+    )
 
 # --- EXPORTAR DATOS ---
+FORMATOS_EXPORTACION = {'csv': 'CSV', 'parquet': 'Parquet (zstd)', 'arrow': 'Arrow'}
+
+@st.cache_resource
+def exportaciones_en_disco():
+    """Archivos exportados, compartidos por todas las sesiones del proceso"""
+    return CacheExportaciones()
+
+def archivo_exportado(datos, filas, columnas, formato, firma):
+    """Bytes del archivo exportado; se escribe por bloques la primera vez que se pide la selección"""
+    return exportar(datos.datos(), filas, columnas, formato, cache=exportaciones_en_disco(), firma=firma)
+
 st.markdown("---")
 col_export1, col_export2 = st.columns(2)
 
 with col_export1:
-    if st.button("📥 Descargar Datos Filtrados (CSV)", type="primary"):
-        if columnas_seleccionadas:
-            csv = df_filtrado[columnas_seleccionadas].to_csv(index=False)
-            st.download_button(
-                label="💾 Descargar CSV",
-                data=csv,
-                file_name=f"datos_filtrados_{'-'.join(map(str, años_seleccionados_filtro))}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.error("Selecciona al menos una columna para exportar")
+    formato_exportacion = st.radio(
+        "Formato de exportación:", list(FORMATOS_EXPORTACION), horizontal=True,
+        format_func=FORMATOS_EXPORTACION.get, key='formato_exportacion'
+    )
+    # El archivo se escribe al hacer clic (un solo clic), por bloques en disco, y queda en
+    # caché con la firma de la selección: otra descarga igual solo lo vuelve a leer
+    st.download_button(
+        "📥 Descargar Datos Filtrados",
+        data=partial(
+            archivo_exportado, prestamo_datos, filas_seleccion, tuple(columnas_seleccionadas), formato_exportacion,
+            congelar((prestamo_datos.claves, filtros_activos, columnas_seleccionadas, formato_exportacion))
+        ),
+        file_name=f"datos_filtrados_{'-'.join(map(str, años_seleccionados_filtro))}.{FORMATOS[formato_exportacion][1]}",
+        mime=FORMATOS[formato_exportacion][0],
+        type="primary", on_click='ignore', disabled=not columnas_seleccionadas,
+        help=f"{len(filas_seleccion):,} registros con las columnas seleccionadas en la tabla de detalle"
+    )
+    if not columnas_seleccionadas:
+        st.error("Selecciona al menos una columna para exportar")
 
 with col_export2:
     st.markdown(f"""